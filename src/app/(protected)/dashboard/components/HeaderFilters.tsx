@@ -1,5 +1,5 @@
 import { useEffect, useState } from 'react';
-import { getProducts, getCameras, getLines } from "@/app/libs/services/dashboard";
+import { getFilterOptions } from "@/app/libs/services/dashboard";
 import type { ProductOption, CameraOption, LineOption } from '@/app/types/dashboard';
 import { showError } from '@/app/utils/swal';
 import DateFilters from './DateFilters';
@@ -34,11 +34,7 @@ export default function HeaderFilters(props: HeaderFiltersProps) {
   useEffect(() => {
     const loadAllData = async () => {
       try {
-        const [products, cameras, lines] = await Promise.all([
-          getProducts(),
-          getCameras(),
-          getLines()
-        ]);
+        const { products, cameras, lines } = await getFilterOptions();
 
         setOptions({
           products,
@@ -27,7 +27,7 @@ export default function CameraBox({ location, cameraName, liveStream, loading }:
               </div>
               <img
                 className="absolute inset-0 w-full h-full object-cover"
-                src={`data:image/jpeg;base64,${liveStream}`}
+                src={liveStream?.startsWith('blob:') ? liveStream : `data:image/jpeg;base64,${liveStream}`}
                 alt="Live stream"
               />
               {/* <video
@@ -3,7 +3,7 @@
 import { useState, useEffect } from "react";
 import { showConfirm, showSuccess, showError } from '@/app/utils/swal'
 import { formatNumber, toNumber } from "@/app/utils/format";
-import { useLiveSocketStore } from '@/app/stores/useLiveSocketStore';
+import { useLiveSocketStore, parseLiveMessage } from '@/app/stores/useLiveSocketStore';
 import { Planning } from "@/app/types/planning";
 import { startPlansConfirmation, stopPlans } from "@/app/libs/services/planning";
 import SummaryBox from "./summary-box";
@@ -79,10 +79,15 @@ export default function LiveInspectionViewPage({ cameraId }: { cameraId: string
     }
 
     socket.onmessage = (event: MessageEvent) => {
-      const incoming = JSON.parse(event.data);
+      const incoming = parseLiveMessage(event.data);
       if (incoming.cameraId === cameraId) {
-        setData(incoming);
+        setData(prev => {
+          if (prev?.liveStream?.startsWith('blob:')) URL.revokeObjectURL(prev.liveStream);
+          return incoming;
+        });
         setLoading(false);
+      } else if (incoming.liveStream?.startsWith('blob:')) {
+        URL.revokeObjectURL(incoming.liveStream);
       }
     };
 
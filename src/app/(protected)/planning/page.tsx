@@ -13,9 +13,11 @@ import { useSession } from "next-auth/react";
 import { Menu, Action } from '@/app/constants/menu';
 import { extractErrorMessage } from '@/app/utils/errorHandler';
 import { formatDateTime } from "@/app/utils/date";
+import type { Page, PageRequest } from "@/app/types/paging";
 import UploadButton from "@/app/components/common/UploadButton";
 import ExportButton from "@/app/components/common/ExportButton";
 import DataTable from "@/app/components/table/DataTable";
+import useCursorPaging from "@/app/components/table/useCursorPaging";
 import PlanningColumns from "./components/planning-column";
 import PlanningFilterForm from './components/planning-filter';
 import PlanningFormModal from "./components/planning-form";
@@ -33,7 +35,7 @@ export default function Page() {
     handleSearch();
   }, []);
 
-  const handleSearch = async () => {
+  const loadPage = async (paging: PageRequest): Promise<Page<Planning>> => {
     try {
       const formValues = getValues();
       const param: ParamSearch = {
@@ -44,15 +46,17 @@ export default function Page() {
         lotNo: formValues.lotNo || '',
         lineId: formValues.lineId || '',
       };
-      const plans = await search(param);
-      setData(Array.isArray(plans) ? plans : []);
+      return await search(param, paging);
     } catch (error) {
       console.error("Search operation failed:", error);
       showError('Search failed');
-      setData([]);
+      return { rows: [] };
     }
   };
 
+  const paging = useCursorPaging(loadPage, setData);
+  const handleSearch = () => paging.first();
+
   const handleExport = (type: ExportType) => {
     try {
       const headers = ["Plan ID", "Product ID", "Lot No", "Line ID", "Start Date", "End Date"];
@@ -203,6 +207,7 @@ export default function Page() {
             data,
           })}
           data={data}
+          paging={paging}
           selectedIds={selectedIds}
           defaultSorting={[{ id: "planId", desc: false }]}
         />
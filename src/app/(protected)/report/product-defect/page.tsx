@@ -12,8 +12,10 @@ import { usePermission } from '@/app/contexts/permission-context';
 import { Menu, Action } from '@/app/constants/menu';
 import { extractErrorMessage } from '@/app/utils/errorHandler';
 import { formatDateTime } from "@/app/utils/date";
+import type { Page, PageRequest } from "@/app/types/paging";
 import ExportButton from "@/app/components/common/ExportButton";
 import DataTable from "@/app/components/table/DataTable";
+import useCursorPaging from "@/app/components/table/useCursorPaging";
 import ReportProductColumns from "./components/report-product-column";
 import ReportProductFormModal from "./components/report-product-form";
 import ReportProductFilterForm from './components/report-product-filter';
@@ -30,7 +32,7 @@ export default function Page() {
     handleSearch();
   }, []);
 
-  const handleSearch = async () => {
+  const loadPage = async (paging: PageRequest): Promise<Page<ReportProduct>> => {
     try {
       const formValues = getValues();
       const param: ParamSearch = {
@@ -40,15 +42,17 @@ export default function Page() {
         defectTypeId: formValues.defectTypeId || '',
         cameraId: formValues.cameraId || '',
       };
-      const products = await search(param);
-      setData(Array.isArray(products) ? products : []);
+      return await search(param, paging);
     } catch (error) {
       console.error("Error search product:", error);
       showError('Error search product');
-      setData([]);
+      return { rows: [] };
     }
   };
 
+  const paging = useCursorPaging(loadPage, setData);
+  const handleSearch = () => paging.first();
+
   const handleExport = (type: ExportType) => {
     try {
       const headers = ["Datetime", "Product ID", "Defect Type ID", "Camera ID", "Status"];
@@ -148,6 +152,7 @@ export default function Page() {
             data,
           })}
           data={data}
+          paging={paging}
           defaultSorting={[{ id: "datetime", desc: true }]}
         />
 
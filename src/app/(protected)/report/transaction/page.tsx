@@ -11,8 +11,10 @@ import { usePermission } from '@/app/contexts/permission-context';
 import { Menu, Action } from '@/app/constants/menu';
 import { extractErrorMessage } from '@/app/utils/errorHandler';
 import { formatDateTime } from "@/app/utils/date";
+import type { Page, PageRequest } from "@/app/types/paging";
 import ExportButton from "@/app/components/common/ExportButton";
 import DataTable from "@/app/components/table/DataTable";
+import useCursorPaging from "@/app/components/table/useCursorPaging";
 import TransactionColumns from "./components/transaction-column";
 import TransactionFilterForm from './components/transaction-filter';
 
@@ -26,7 +28,7 @@ export default function Page() {
     handleSearch();
   }, []);
 
-  const handleSearch = async () => {
+  const loadPage = async (paging: PageRequest): Promise<Page<Transaction>> => {
     try {
       const formValues = getValues();
       const param: ParamSearch = {
@@ -35,15 +37,17 @@ export default function Page() {
         lotNo: formValues.lotNo || '',
         productId: formValues.productId || '',
       };
-      const transactions = await search(param);
-      setData(Array.isArray(transactions) ? transactions : []);
+      return await search(param, paging);
     } catch (error) {
       console.error("Search operation failed:", error);
       showError('Search failed');
-      setData([]);
+      return { rows: [] };
     }
   };
 
+  const paging = useCursorPaging(loadPage, setData);
+  const handleSearch = () => paging.first();
+
   const handleExport = (type: ExportType) => {
     try {
       const headers = ["Start Date", "End Date", "Lot ID", "Product Id", "Actual Total Quantity"];
@@ -97,6 +101,7 @@ export default function Page() {
         <DataTable
           columns={TransactionColumns()}
           data={data}
+          paging={paging}
           defaultSorting={[{ id: "lotNo", desc: false }]}
         />
 
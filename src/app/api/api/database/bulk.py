@@ -0,0 +1,28 @@
+import os
+from sqlalchemy import column, table
+from sqlalchemy.dialects.postgresql import insert
+
+# Rows per INSERT statement; psycopg2 expands each chunk into one multi-row VALUES
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "1000"))
+
+
+def bulk_insert(conn, table_name: str, rows: list, conflict: tuple = None, update: tuple = None,
+                chunk_size: int = BULK_CHUNK_SIZE):
+    # Runs on the caller's connection/session so every chunk shares one transaction.
+    # With `conflict` set, existing rows are updated (`update` columns) or skipped.
+    # Rows repeating a conflict key are collapsed first, the last one winning:
+    # one ON CONFLICT DO UPDATE statement cannot affect the same row twice.
+    if conflict and update:
+        rows = list({tuple(row[c] for c in conflict): row for row in rows}.values())
+    if not rows:
+        return 0
+    columns = list(rows[0].keys())
+    stmt = insert(table(table_name, *(column(c) for c in columns), schema="public"))
+    if conflict and update:
+        stmt = stmt.on_conflict_do_update(index_elements=list(conflict),
+                                          set_={c: stmt.excluded[c] for c in update})
+    elif conflict:
+        stmt = stmt.on_conflict_do_nothing(index_elements=list(conflict))
+    for start in range(0, len(rows), chunk_size):
+        conn.execute(stmt, rows[start:start + chunk_size])
+    return len(rows)
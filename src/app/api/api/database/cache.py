@@ -0,0 +1,123 @@
+import functools
+import inspect
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+MASTER_DATA_CACHE_TTL = float(os.getenv("MASTER_DATA_CACHE_TTL", "300"))
+MASTER_DATA_CACHE_SIZE = int(os.getenv("MASTER_DATA_CACHE_SIZE", "256"))
+
+
+# In-process LRU cache; entries expire after `ttl` seconds and are tagged with the
+# tables they were read from so a write can drop exactly those entries
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, tables, value, stamp)
+        self._stamps = itertools.count(1)  # load generation, a new one for every stored entry
+        self._versions = {}  # table -> write counter, guards against storing stale loads
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[2]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def _store(self, key, tables, value, versions, store_empty, ttl=None):
+        # _fetch_all swallows DB errors into [], don't pin that for a whole TTL
+        if not value and not store_empty:
+            return
+        with self._lock:
+            # A write landed while we were loading; the value may predate it
+            if any(self._versions.get(t, 0) != v for t, v in versions.items()):
+                return
+            expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self._entries[key] = (expires_at, tables, value, next(self._stamps))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def _store_async(self, key, tables, pending, versions, store_empty, ttl=None):
+        value = await pending
+        self._store(key, tables, value, versions, store_empty, ttl)
+        return value
+
+    def get_or_load(self, key, loader, tables, store_empty: bool = True, ttl: float = None):
+        with self._lock:
+            versions = {t: self._versions.get(t, 0) for t in tables}
+        found, value = self._lookup(key)
+        if found:
+            return value
+        value = loader()
+        if inspect.isawaitable(value):
+            return self._store_async(key, tables, value, versions, store_empty, ttl)
+        self._store(key, tables, value, versions, store_empty, ttl)
+        return value
+
+    def stamp(self, key, value=None):
+        # Load generation of the live entry under `key` (only if it holds `value`
+        # when given), None without one. Not counted as a lookup
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic() or (value is not None and entry[2] is not value):
+                return None
+            return entry[3]
+
+    def invalidate(self, *tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+            stale = [key for key, entry in self._entries.items() if set(entry[1]) & set(tables)]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "versions": dict(self._versions),
+            }
+
+
+master_data_cache = TTLCache(MASTER_DATA_CACHE_SIZE, MASTER_DATA_CACHE_TTL)
+
+
+def cached(*tables):
+    # Caches a `get_*(self, db, *args)` reader; the session is not part of the key
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, db, *args):
+            return master_data_cache.get_or_load(
+                wrapper.cache_key(*args), lambda: func(self, db, *args), tables, store_empty=False
+            )
+        wrapper.cache_key = lambda *args: (func.__qualname__, args)
+        return wrapper
+    return decorator
@@ -1,26 +1,45 @@
-from database.connect_to_db import engine, SessionLocal, Session, text, SQLAlchemyError
+from database.connect_to_db import AsyncSession, SessionLocal, Session, text, SQLAlchemyError
 from datetime import datetime
 import database.schemas as schemas
+from database.cache import cached, master_data_cache
 from fastapi import HTTPException
 from fastapi.responses import JSONResponse
+
+# streamurl may carry credentials for the capture source; it is read only by
+# streaming/camera_stream.py and never returned by the API
+CAMERA_LIST_SQL = """
+    SELECT cameraid, cameraname, cameralocation, camerastatus, createdby, createddate, updatedby, updateddate, isdeleted
+    FROM camera WHERE isdeleted = false
+"""
+
+
 def error_response(code: int, message: str):
     return JSONResponse(
         status_code=code,
         content={"status": code, "detail": {"error": message}}
     )
 class CameraDB:
-    def _fetch_all(self, query: str):
+    def _fetch_all(self, query: str, db: Session):
         try:
-            with engine.connect() as conn:
-                result = conn.execute(text(query))
-                return [dict(row) for row in result.mappings()]
-
+            result = db.execute(text(query))
+            return [dict(row) for row in result.mappings()]
         except SQLAlchemyError as e:
             print(f"Database error: {e}")
             return []
 
-    def get_cameras(self):
-        return self._fetch_all("SELECT * FROM camera WHERE isdeleted = false")
+    @cached("camera")
+    def get_cameras(self, db: Session):
+        return self._fetch_all(CAMERA_LIST_SQL, db)
+
+
+class AsyncCameraDB(CameraDB):
+    async def _fetch_all(self, query: str, db: AsyncSession):
+        try:
+            result = await db.execute(text(query))
+            return [dict(row) for row in result.mappings()]
+        except SQLAlchemyError as e:
+            print(f"Database error: {e}")
+            return []
 
 
 class CameraService:
@@ -38,10 +57,10 @@ class CameraService:
         insert_sql = text("""
             INSERT INTO camera (
                 cameraid, cameraname, cameralocation,
-                camerastatus, createdby, createddate
+                camerastatus, streamurl, createdby, createddate
             ) VALUES (
                 :cameraid, :cameraname, :cameralocation,
-                :camerastatus, :createdby, :createddate
+                :camerastatus, :streamurl, :createdby, :createddate
             )
         """)
         db.execute(insert_sql, {
@@ -49,10 +68,12 @@ class CameraService:
             "cameraname": camera.cameraname,
             "cameralocation": camera.cameralocation,
             "camerastatus": camera.camerastatus,
+            "streamurl": camera.streamurl,
             "createdby": camera.createdby,
             "createddate": camera.createddate or datetime.now(),
         })
         db.commit()
+        master_data_cache.invalidate("camera")
 
         return {"status": "Camera inserted successfully", "cameraid": camera.cameraid}
     
@@ -71,6 +92,8 @@ class CameraService:
             update_fields["cameralocation"] = camera.cameralocation
         if camera.camerastatus is not None:
             update_fields["camerastatus"] = camera.camerastatus
+        if camera.streamurl is not None:
+            update_fields["streamurl"] = camera.streamurl
         if camera.updatedby:
             if not db.execute(text("SELECT 1 FROM \"user\" WHERE userid = :userid"),
                             {"userid": camera.updatedby}).first():
@@ -94,6 +117,7 @@ class CameraService:
 
         db.execute(update_sql, update_fields)
         db.commit()
+        master_data_cache.invalidate("camera")
 
         return {"status": "Camera updated successfully", "cameraid": cameraid}
     
@@ -105,6 +129,7 @@ class CameraService:
 
         db.execute(text("UPDATE camera SET isdeleted = true WHERE cameraid = :cameraid"), {"cameraid": cameraid})
         db.commit()
+        master_data_cache.invalidate("camera")
         return {"status": 200, "detail": {"message": "Camera marked as deleted", "cameraid": cameraid}}
 
 
@@ -1,18 +1,70 @@
+import inspect
+import os
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from starlette.concurrency import run_in_threadpool
+from database.pool_metrics import TimedQueuePool, TimedAsyncQueuePool, collect_pool_metrics
 
-DB_HOST = "127.0.0.1"
-DB_PORT = 15432
-DB_NAME = "mydb"
-DB_USER = "user"
-DB_PASS = "password"
+def _env_bool(name: str, default: str = "false"):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+DB_HOST = os.getenv("DB_HOST", "127.0.0.1")
+DB_PORT = int(os.getenv("DB_PORT", "15432"))
+DB_NAME = os.getenv("DB_NAME", "mydb")
+DB_USER = os.getenv("DB_USER", "user")
+DB_PASS = os.getenv("DB_PASS", "password")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Pool sizing per process; size + overflow of every process must fit in max_connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", "true")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+DB_APPLICATION_NAME = os.getenv("DB_APPLICATION_NAME", "pi-backend")
+
+# Serve read-heavy endpoints through asyncpg instead of the psycopg2 threadpool
+DB_ASYNC = _env_bool("DB_ASYNC")
+
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+_connect_args = {"application_name": DB_APPLICATION_NAME}
+if DB_STATEMENT_TIMEOUT_MS:
+    _connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
 
-engine = create_engine(DATABASE_URL)
+engine = create_engine(
+    DATABASE_URL,
+    poolclass=TimedQueuePool,
+    connect_args=_connect_args,
+    **POOL_OPTIONS,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+if DB_ASYNC:
+    _server_settings = {"application_name": DB_APPLICATION_NAME}
+    if DB_STATEMENT_TIMEOUT_MS:
+        _server_settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        poolclass=TimedAsyncQueuePool,
+        connect_args={"server_settings": _server_settings},
+        **POOL_OPTIONS,
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 def test_db_connection():
     try:
         with engine.connect() as conn:
@@ -20,7 +72,7 @@ def test_db_connection():
             return {"db_version": version}
     except SQLAlchemyError as e:
         raise RuntimeError(f"Database connection failed: {str(e)}")
-    
+
 def get_db():
     db = SessionLocal()
     try:
@@ -28,4 +80,19 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# One session per request: list endpoints read through the async session when enabled
+get_read_db = get_async_db if DB_ASYNC else get_db
+
+async def run_db(func, *args):
+    # Async DB classes are awaited on the event loop, sync ones go to the threadpool
+    if DB_ASYNC:
+        result = func(*args)
+        return await result if inspect.isawaitable(result) else result
+    return await run_in_threadpool(func, *args)
 
+def get_pool_metrics():
+    return collect_pool_metrics(("sync", engine), ("async", async_engine))
@@ -1,206 +1,379 @@
-from database.connect_to_db import engine, SessionLocal, Session, text, SQLAlchemyError
+from database.connect_to_db import engine, SessionLocal, Session, AsyncSession, text, SQLAlchemyError
 from datetime import datetime
+import asyncio
+import json
+import logging
+import os
 import database.schemas as schemas
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
+from database.cache import cached, master_data_cache
 
-class DashboardDB:
-    def get_defects_with_ng_gt_zero(self, start:datetime, end:datetime, db: Session ):
-        sql = """
-        SELECT 
-            pdr.prodid,
-            pdr.defectid,
-            dt.defecttype,
-            pdr.cameraid,
-            ds.prodlot AS LINE,
-            cam.cameraname,
-            COALESCE(ds.totalng, 0) AS totalng,
-            pdr.defecttime
-        FROM productdefectresult pdr
-        LEFT JOIN defecttype dt ON pdr.defectid = dt.defectid
-        LEFT JOIN camera cam ON pdr.cameraid = cam.cameraid
-        LEFT JOIN defectsummary ds ON pdr.prodid = ds.prodid AND pdr.defectid = ds.defectid
-        WHERE COALESCE(ds.totalng, 0) > 0
-        AND pdr.defecttime BETWEEN :start AND :end
-        """
-        result = db.execute(sql, {
-    "start": start,
-    "end": end
-}).fetchall()
-        return [dict(row._mapping) for row in result]
-
-
-    def get_good_ng(self, 
-        # start: datetime,
-        # end: datetime,
-        # productname: Optional[str] = Query(None),
-        # prodline: Optional[str] = Query(None),
-        # cameraid: Optional[str] = Query(None), 
-        db: Session):
-        sql = """
+# The dashboard charts read dashboard_hourly_rollup, which holds per-hour counts
+# of productdefectresult. Rows are folded in incrementally past a resultid watermark.
+DASHBOARD_ROLLUP_INTERVAL = float(os.getenv("DASHBOARD_ROLLUP_INTERVAL", "30"))
+DASHBOARD_ROLLUP_BATCH = int(os.getenv("DASHBOARD_ROLLUP_BATCH", "50000"))
+
+ROLLUP_SQL = """
+    WITH batch AS (
         SELECT
-            p.prodname,
-            p.cameraid,
-            ds.prodlot as line,
-            ds.total_ok,
-            ds.total_ng,
-            ROUND(ds.total_ok::numeric * 100 / NULLIF(ds.total_ok + ds.total_ng, 0), 2) AS ok_ratio_percent,
-            ROUND(ds.total_ng::numeric * 100 / NULLIF(ds.total_ok + ds.total_ng, 0), 2) AS ng_ratio_percent
-        FROM (
+            DATE_TRUNC('hour', pdr.defecttime) AS hour_slot,
+            COALESCE(pdr.prodid, '') AS prodid,
+            COALESCE(pdr.prodname, '') AS prodname,
+            COALESCE(ds.prodlot, '') AS prodline,
+            COALESCE(pdr.cameraid, '') AS cameraid,
+            COALESCE(pdr.defectid, '') AS defectid,
+            COALESCE(pdr.defecttype, '') AS defecttype,
+            COALESCE(pdr.prodstatus, '') AS prodstatus,
+            COUNT(*) AS quantity
+        FROM public.productdefectresult pdr
+        LEFT JOIN public.defectsummary ds ON pdr.prodid = ds.prodid
+        WHERE pdr.resultid > :last AND pdr.resultid <= :upto AND pdr.defecttime IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5, 6, 7, 8
+    ), rollup AS (
+        INSERT INTO public.dashboard_hourly_rollup (
+            hour_slot, prodid, prodname, prodline, cameraid, defectid, defecttype, prodstatus, quantity
+        )
+        SELECT * FROM batch
+        ON CONFLICT (hour_slot, prodid, prodname, prodline, cameraid, defectid, defecttype, prodstatus)
+        DO UPDATE SET quantity = dashboard_hourly_rollup.quantity + EXCLUDED.quantity
+    )
+    INSERT INTO public.dashboard_facets (facet, value, quantity)
+    SELECT facet, value, SUM(quantity) FROM (
+        SELECT 'product' AS facet, prodname AS value, quantity FROM batch
+        UNION ALL SELECT 'camera', cameraid, quantity FROM batch
+        UNION ALL SELECT 'line', prodline, quantity FROM batch
+    ) f
+    WHERE value <> ''
+    GROUP BY facet, value
+    ON CONFLICT (facet, value) DO UPDATE SET quantity = dashboard_facets.quantity + EXCLUDED.quantity
+"""
+
+# Last watermark this process has seen; when it moves (here or in another
+# worker) the cached dropdown facets are dropped
+_seen_watermark = None
+
+
+STATE_SQL = """
+    SELECT
+        last_resultid,
+        pending_resultid,
+        pending_xmax IS NOT NULL AND pending_xmax <= pg_snapshot_xmin(pg_current_snapshot()) AS settled
+    FROM public.dashboard_rollup_state WHERE name = 'hourly' FOR UPDATE
+"""
+
+
+def refresh_hourly_rollup():
+    # Returns the new watermark. resultids are handed out before commit, so a
+    # slow transaction can commit an id below one already rolled up. The
+    # watermark therefore only advances to the MAX(resultid) recorded at the
+    # previous refresh, once every transaction that was open back then has
+    # finished. The state row lock makes concurrent refreshers (several
+    # workers) queue instead of double counting; each batch commits on its own.
+    with engine.begin() as conn:
+        state = conn.execute(text(STATE_SQL)).first()
+        if state is None:
+            return None
+        last = state.last_resultid
+        target = state.pending_resultid if state.settled else None
+        if state.settled or state.pending_resultid is None:
+            conn.execute(text("""
+                UPDATE public.dashboard_rollup_state SET
+                    pending_resultid = (SELECT MAX(resultid) FROM public.productdefectresult),
+                    pending_xmax = pg_snapshot_xmax(pg_current_snapshot())
+                WHERE name = 'hourly'
+            """))
+    while target is not None and last < target:
+        with engine.begin() as conn:
+            last = conn.execute(text(STATE_SQL)).scalar()
+            if last >= target:
+                break
+            upto = conn.execute(text("""
+                SELECT MAX(resultid) FROM (
+                    SELECT resultid FROM public.productdefectresult
+                    WHERE resultid > :last AND resultid <= :target ORDER BY resultid LIMIT :batch
+                ) batch
+            """), {"last": last, "target": target, "batch": DASHBOARD_ROLLUP_BATCH}).scalar()
+            upto = upto or target
+            conn.execute(text(ROLLUP_SQL), {"last": last, "upto": upto})
+            conn.execute(text("""
+                UPDATE public.dashboard_rollup_state SET last_resultid = :last, refreshed_at = now()
+                WHERE name = 'hourly'
+            """), {"last": upto})
+            last = upto
+    global _seen_watermark
+    if last != _seen_watermark:
+        master_data_cache.invalidate("dashboard_facets")
+        _seen_watermark = last
+    return last
+
+
+async def rollup_refresher():
+    while True:
+        try:
+            await run_in_threadpool(refresh_hourly_rollup)
+        except SQLAlchemyError as e:
+            logging.warning(f"Dashboard rollup refresh failed: {e}")
+        await asyncio.sleep(DASHBOARD_ROLLUP_INTERVAL)
+
+
+# Good/NG ratios come from the lot totals in defectsummary (mv_good_ng_ratio),
+# which cover all time, for /good-ng-ratio and /dashboard/summary alike
+GOOD_NG_SQL = """
+    SELECT prodname, cameraid, NULLIF(line, '') AS line, total_ok, total_ng, ok_ratio_percent, ng_ratio_percent
+    FROM public.mv_good_ng_ratio{where}
+    ORDER BY prodname, cameraid, line
+"""
+
+# NG totals per camera come from the defectsummary lot totals joined to the
+# results (mv_defects_camera), for /defects-camera and /dashboard/summary alike
+DEFECTS_CAMERA_SQL = """
+    SELECT prodid, defectid, defecttype, cameraid, NULLIF(line, '') AS line, cameraname, totalng, defecttime
+    FROM public.mv_defects_camera
+    WHERE {where}
+    ORDER BY defecttime DESC
+"""
+
+# Every chart in one statement: the filtered rollup slice is materialized once
+# and each chart is a json_agg over it
+SUMMARY_SQL = """
+    WITH filtered AS MATERIALIZED (
+        SELECT * FROM public.dashboard_hourly_rollup WHERE {where}
+    ), top5 AS (
+        SELECT defecttype
+        FROM filtered
+        GROUP BY defecttype
+        ORDER BY SUM(quantity) DESC
+        LIMIT 5
+    )
+    SELECT
+        (SELECT COUNT(DISTINCT prodid) FROM filtered) AS total_products,
+        (SELECT COALESCE(json_agg(t), '[]') FROM ({good_ng}) t) AS good_ng_ratio,
+        (SELECT COALESCE(json_agg(t), '[]') FROM (
             SELECT
-                prodid,
-                prodlot,
-                SUM(totalok) AS total_ok,
-                SUM(totalng) AS total_ng
-            FROM public.defectsummary
-            GROUP BY prodid, prodlot
-        ) ds
-        INNER JOIN (
-            SELECT DISTINCT prodid, prodname, cameraid
-            FROM public.productdefectresult
-            --WHERE defecttime BETWEEN :start AND :end
-        ) p ON ds.prodid = p.prodid
-        """
-        result = db.execute(sql, {
-        # "start": start,
-        # "end": end
-        # "prodlot": prodline,
-        # "productname": productname,
-        # "cameraid": cameraid
-    }).fetchall()
-        return [dict(row._mapping) for row in result]
+                defecttype,
+                NULLIF(prodline, '') AS line,
+                SUM(quantity) AS quantity,
+                ARRAY_AGG(DISTINCT hour_slot ORDER BY hour_slot) AS all_defect_times
+            FROM filtered
+            GROUP BY defecttype, prodline
+            ORDER BY quantity DESC
+            LIMIT 5
+        ) t) AS top5_defects,
+        (SELECT COALESCE(json_agg(t), '[]') FROM (
+            SELECT defecttype, NULLIF(prodline, '') AS line, hour_slot, SUM(quantity) AS quantity
+            FROM filtered
+            WHERE defecttype IN (SELECT defecttype FROM top5)
+            GROUP BY defecttype, hour_slot, prodline
+            ORDER BY hour_slot, defecttype
+        ) t) AS top5_trends,
+        (SELECT COALESCE(json_agg(t), '[]') FROM ({defects_camera}) t) AS defects_camera,
+        (SELECT COALESCE(json_agg(t), '[]') FROM (
+            SELECT defecttype, prodname, NULLIF(prodline, '') AS line, hour_slot, SUM(quantity) AS defect_count
+            FROM filtered
+            GROUP BY defecttype, hour_slot, prodname, prodline
+            ORDER BY hour_slot, defecttype
+        ) t) AS ng_distribution
+"""
+
+SUMMARY_CHARTS = ("good_ng_ratio", "top5_defects", "top5_trends", "defects_camera", "ng_distribution")
+
+
+def _summary(rows: list):
+    row = rows[0] if rows else {}
+    summary = {"total_products": row.get("total_products") or 0}
+    for chart in SUMMARY_CHARTS:
+        value = row.get(chart) or []
+        # asyncpg hands json back undecoded
+        summary[chart] = json.loads(value) if isinstance(value, str) else value
+    return summary
+
+
+def _rollup_where(start: datetime, end: datetime, productname: str = None, prodline: str = None,
+                  cameraid: str = None):
+    where = ["hour_slot >= DATE_TRUNC('hour', CAST(:start AS timestamp))", "hour_slot <= :end"]
+    params = {"start": start, "end": end}
+    for column, value in (("prodname", productname), ("prodline", prodline), ("cameraid", cameraid)):
+        if value is not None:
+            where.append(f"{column} = :{column}")
+            params[column] = value
+    return " AND ".join(where), params
+
+
+def _good_ng_where(productname: str = None, prodline: str = None, cameraid: str = None):
+    # Binds the same parameter names as _rollup_where
+    where = []
+    params = {}
+    for column, name, value in (("prodname", "prodname", productname), ("line", "prodline", prodline),
+                                ("cameraid", "cameraid", cameraid)):
+        if value is not None:
+            where.append(f"{column} = :{name}")
+            params[name] = value
+    return (" WHERE " + " AND ".join(where) if where else ""), params
 
 
-    def ng_distribution(self, start:datetime, end:datetime, db: Session):
+def _defects_camera_where(start: datetime, end: datetime, productname: str = None, prodline: str = None,
+                          cameraid: str = None):
+    # Binds the same parameter names as _rollup_where. The view has no product
+    # name, so that filter goes through the product master
+    where = ["day_slot >= DATE_TRUNC('day', CAST(:start AS timestamp))", "day_slot <= :end"]
+    params = {"start": start, "end": end}
+    if productname is not None:
+        where.append("prodid IN (SELECT prodid FROM public.product WHERE prodname = :prodname)")
+        params["prodname"] = productname
+    for column, name, value in (("line", "prodline", prodline), ("cameraid", "cameraid", cameraid)):
+        if value is not None:
+            where.append(f"{column} = :{name}")
+            params[name] = value
+    return " AND ".join(where), params
+
+
+def _summary_query(start: datetime, end: datetime, productname: str = None, prodline: str = None,
+                   cameraid: str = None):
+    where, params = _rollup_where(start, end, productname, prodline, cameraid)
+    ratio_where, ratio_params = _good_ng_where(productname, prodline, cameraid)
+    camera_where, camera_params = _defects_camera_where(start, end, productname, prodline, cameraid)
+    sql = SUMMARY_SQL.format(
+        where=where,
+        good_ng=GOOD_NG_SQL.format(where=ratio_where),
+        defects_camera=DEFECTS_CAMERA_SQL.format(where=camera_where),
+    )
+    return sql, {**params, **ratio_params, **camera_params}
+
+
+def group_facets(rows: list):
+    # dashboard_facets rows -> the three dropdown lists used by HeaderFilters
+    lists = {"products": [], "cameras": [], "lines": []}
+    for r in rows:
+        lists[r["facet"] + "s"].append({"id": r["id"], "name": r["name"], "count": r["count"]})
+    return lists
+
+class DashboardDB:
+    def get_defects_with_ng_gt_zero(self, db: Session, start: datetime, end: datetime):
+        where, params = _defects_camera_where(start, end)
+        return self._fetch_all(DEFECTS_CAMERA_SQL.format(where=where), db, params)
+
+    def get_good_ng(self, db: Session, productname: str = None, prodline: str = None, cameraid: str = None):
+        where, params = _good_ng_where(productname, prodline, cameraid)
+        return self._fetch_all(GOOD_NG_SQL.format(where=where), db, params)
+
+    def get_view_status(self, db: Session, view: str):
         sql = """
-            SELECT 
-                pdr.defecttype,
-                pdr.prodname,
-                ds.prodlot as line,
-                DATE_TRUNC('hour', pdr.defecttime) AS hour_slot,
-                COUNT(*) AS defect_count
-            FROM public.productdefectresult pdr
-            LEFT JOIN public.defectsummary ds ON pdr.prodid = ds.prodid
-            WHERE pdr.defecttime BETWEEN :start AND :end
-            AND (:productname IS NULL OR pdr.prodname = :productname)
-            AND (:prodline IS NULL OR ds.prodlot = :prodline)
-            AND (:cameraid IS NULL OR pdr.cameraid = :cameraid)
-            GROUP BY pdr.defecttype, hour_slot, pdr.prodname, ds.prodlot
-            ORDER BY hour_slot, pdr.defecttype;
+            SELECT refreshed_at, EXTRACT(EPOCH FROM now() - refreshed_at) AS age_seconds, duration_ms
+            FROM public.mv_refresh_log
+            WHERE viewname = :view
         """
-        result = db.execute(text(sql), {model}).fetchall()
-        return [dict(row._mapping) for row in result]
+        return self._fetch_all(sql, db, {"view": view})
 
+    def _fetch_all(self, query: str, db: Session, params: dict = None):
+        try:
+            result = db.execute(text(query), params or {})
+            return [dict(row) for row in result.mappings()]
+        except SQLAlchemyError as e:
+            print(f"Database error: {e}")
+            return []
 
-    def get_top5_defects(self, start:datetime, end:datetime , db: Session ):
-        sql = """
+    def ng_distribution(self, db: Session, start: datetime, end: datetime, productname: str = None,
+                        prodline: str = None, cameraid: str = None):
+        where, params = _rollup_where(start, end, productname, prodline, cameraid)
+        sql = f"""
             SELECT
-                pdr.defecttype,
-                ds.prodlot AS line,
-                COUNT(*) AS quantity,
-                ARRAY_AGG(pdr.defecttime ORDER BY pdr.defecttime) AS all_defect_times
-            FROM public.productdefectresult pdr
-            LEFT JOIN public.defectsummary ds ON pdr.prodid = ds.prodid 
-            WHERE pdr.defecttime BETWEEN :start AND :end
-            AND (:productname IS NULL OR pdr.prodname = :productname)
-            AND (:prodline IS NULL OR ds.prodlot = :prodline)
-            AND (:cameraid IS NULL OR pdr.cameraid = :cameraid)
-            GROUP BY pdr.defecttype, ds.prodlot
-            ORDER BY quantity DESC
-            LIMIT 5;
+                defecttype,
+                prodname,
+                NULLIF(prodline, '') AS line,
+                hour_slot,
+                SUM(quantity) AS defect_count
+            FROM public.dashboard_hourly_rollup
+            WHERE {where}
+            GROUP BY defecttype, hour_slot, prodname, prodline
+            ORDER BY hour_slot, defecttype
         """
-        
-        result = db.execute(text(sql), {model}).fetchall()
+        return self._fetch_all(sql, db, params)
 
-        return [dict(row._mapping) for row in result]
+    def get_top5_defects(self, db: Session, start: datetime, end: datetime, productname: str = None,
+                         prodline: str = None, cameraid: str = None):
+        where, params = _rollup_where(start, end, productname, prodline, cameraid)
+        sql = f"""
+            SELECT
+                defecttype,
+                NULLIF(prodline, '') AS line,
+                SUM(quantity) AS quantity,
+                ARRAY_AGG(DISTINCT hour_slot ORDER BY hour_slot) AS all_defect_times
+            FROM public.dashboard_hourly_rollup
+            WHERE {where}
+            GROUP BY defecttype, prodline
+            ORDER BY quantity DESC
+            LIMIT 5
+        """
+        return self._fetch_all(sql, db, params)
 
+    def get_top_5_trends(self, db: Session, start: datetime, end: datetime, productname: str = None,
+                         prodline: str = None, cameraid: str = None):
+        where, params = _rollup_where(start, end, productname, prodline, cameraid)
+        sql = f"""
+            WITH filtered AS (
+                SELECT * FROM public.dashboard_hourly_rollup WHERE {where}
+            ), top5 AS (
+                SELECT defecttype
+                FROM filtered
+                GROUP BY defecttype
+                ORDER BY SUM(quantity) DESC
+                LIMIT 5
+            )
+            SELECT
+                defecttype,
+                NULLIF(prodline, '') AS line,
+                hour_slot,
+                SUM(quantity) AS quantity
+            FROM filtered
+            WHERE defecttype IN (SELECT defecttype FROM top5)
+            GROUP BY defecttype, hour_slot, prodline
+            ORDER BY hour_slot, defecttype
+        """
+        return self._fetch_all(sql, db, params)
 
-    async def get_top_5_trends(self, start:datetime, end:datetime, db: Session  ):
-        sql = """
-        SELECT 
-            pdr.defecttype,
-            ds.prodlot as line,
-            DATE_TRUNC('hour', pdr.defecttime) AS hour_slot,
-            COUNT(*) AS quantity
-        FROM public.productdefectresult pdr
-        LEFT JOIN public.defectsummary ds ON pdr.prodid = ds.prodid 
-        WHERE pdr.defecttime BETWEEN :start AND :end
-        AND (:productname IS NULL OR pdr.prodname = :productname)
-        AND (:prodline IS NULL OR ds.prodlot = :prodline)
-        AND (:cameraid IS NULL OR pdr.cameraid = :cameraid)
-        AND pdr.defecttype IN (
-            SELECT pdr2.defecttype
-            FROM public.productdefectresult pdr2
-            LEFT JOIN public.defectsummary ds2 ON pdr2.prodid = ds2.prodid 
-            WHERE pdr2.defecttime BETWEEN :start AND :end
-            AND (:productname IS NULL OR pdr2.prodname = :productname)
-            AND (:prodline IS NULL OR ds2.prodlot = :prodline)
-            AND (:cameraid IS NULL OR pdr2.cameraid = :cameraid)
-            GROUP BY pdr2.defecttype
-            ORDER BY COUNT(*) DESC
-            LIMIT 5
-        )
-        GROUP BY pdr.defecttype, hour_slot, ds.prodlot
-        ORDER BY hour_slot, pdr.defecttype;
+    def get_total_products(self, db: Session, start: datetime, end: datetime, productname: str = None,
+                           prodline: str = None, cameraid: str = None):
+        where, params = _rollup_where(start, end, productname, prodline, cameraid)
+        sql = f"""
+            SELECT COUNT(DISTINCT prodid) AS total_products
+            FROM public.dashboard_hourly_rollup
+            WHERE {where}
         """
-        result = db.execute(text(sql), {model}).fetchall()
-        
-        return [dict(row._mapping) for row in result]
+        return self._fetch_all(sql, db, params)
+
 
+    def get_summary(self, db: Session, start: datetime, end: datetime, productname: str = None,
+                    prodline: str = None, cameraid: str = None):
+        sql, params = _summary_query(start, end, productname, prodline, cameraid)
+        return _summary(self._fetch_all(sql, db, params))
 
-    def get_total_products(self, start:datetime, end:datetime, db: Session ):
+    # Dropdown data for the dashboard filters, kept per value with result counts
+    # in dashboard_facets by refresh_hourly_rollup
+
+    @cached("dashboard_facets", "camera")
+    def get_filters(self, db: Session):
         sql = """
-        SELECT 
-            COUNT(DISTINCT pdr.prodid) as total_products
-        FROM public.productdefectresult pdr
-        LEFT JOIN public.defectsummary ds ON pdr.prodid = ds.prodid
-        WHERE pdr.defecttime BETWEEN :start AND :end
-        AND (:productname IS NULL OR pdr.prodname = :productname)
-        AND (:prodline IS NULL OR ds.prodlot = :prodline)
-        AND (:cameraid IS NULL OR pdr.cameraid = :cameraid)
+            SELECT f.facet, f.value AS id, COALESCE(cam.cameraname, f.value) AS name, f.quantity AS count
+            FROM public.dashboard_facets f
+            LEFT JOIN public.camera cam ON f.facet = 'camera' AND cam.cameraid = f.value
+            ORDER BY f.facet, f.value
         """
-        
-        result = db.execute(text(sql), {model}).fetchone()
-        return {"total_products": result[0] if result else 0}
-
-
-    # New endpoints for dropdown data
-
-    def get_products_list(db: Session):
-      try:
-          sql = "SELECT DISTINCT prodname FROM productdefectresult WHERE prodname IS NOT NULL ORDER BY prodname"
-          result = db.execute(text(sql)).fetchall()
-          return [{"id": row[0], "name": row[0]} for row in result]
-      except Exception as e:
-          return {"error": str(e)}
-
-
-    def get_cameras_list(db: Session):
-      try:
-          sql = """
-          SELECT DISTINCT 
-              pdr.cameraid,
-              COALESCE(cam.cameraname, pdr.cameraid) as cameraname
-          FROM productdefectresult pdr
-          LEFT JOIN camera cam ON pdr.cameraid = cam.cameraid
-          WHERE pdr.cameraid IS NOT NULL 
-          ORDER BY pdr.cameraid
-          """
-          result = db.execute(text(sql)).fetchall()
-          return [{"id": row[0], "name": row[1]} for row in result]
-      except Exception as e:
-          return {"error": str(e)}
-
-
-    def get_lines_list(db: Session):
-      try:
-          sql = """
-          SELECT DISTINCT ds.prodlot 
-          FROM defectsummary ds 
-          WHERE ds.prodlot IS NOT NULL 
-          ORDER BY ds.prodlot
-          """
-          result = db.execute(text(sql)).fetchall()
-          return [{"id": row[0], "name": row[0]} for row in result]
-      except Exception as e:
-          return {"error": str(e)}
\ No newline at end of file
+        return self._fetch_all(sql, db)
+
+
+class AsyncDashboardDB(DashboardDB):
+    async def get_summary(self, db: AsyncSession, start: datetime, end: datetime, productname: str = None,
+                          prodline: str = None, cameraid: str = None):
+        sql, params = _summary_query(start, end, productname, prodline, cameraid)
+        return _summary(await self._fetch_all(sql, db, params))
+
+    async def _fetch_all(self, query: str, db: AsyncSession, params: dict = None):
+        try:
+            result = await db.execute(text(query), params or {})
+            return [dict(row) for row in result.mappings()]
+        except SQLAlchemyError as e:
+            print(f"Database error: {e}")
+            return []
+
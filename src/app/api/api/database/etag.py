@@ -0,0 +1,43 @@
+import uuid
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from database.cache import master_data_cache
+from database.connect_to_db import run_db
+
+# Cache entries are numbered per process, so the tag names the process too
+PROCESS_TAG = uuid.uuid4().hex[:12]
+
+
+def cache_etag(reader, rows: list = None):
+    # The validator of a @cached reader's list is the load generation of its
+    # cache entry. Any write to the entry's tables drops it, and so does the
+    # TTL, so the next load carries a new tag
+    stamp = master_data_cache.stamp(reader.cache_key(), rows)
+    return None if stamp is None else f'"{PROCESS_TAG}-{stamp}"'
+
+
+def etag_matches(request: Request, etag: str):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 13.1.2): ignore the W/ prefix on both sides
+    wanted = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == wanted for tag in header.split(","))
+
+
+async def conditional_response(request: Request, key: str, reader, db):
+    # A revalidation is answered from the cache entry alone, before any query
+    # or serialization
+    etag = cache_etag(reader)
+    if etag is not None and etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    rows = await run_db(reader, db)
+    headers = {"Cache-Control": "no-cache"}
+    # Tagged only when the rows are the cached ones, not a load that lost a race with a write
+    etag = cache_etag(reader, rows)
+    if etag is not None:
+        headers["ETag"] = etag
+    return JSONResponse(content=jsonable_encoder({key: rows}), headers=headers)
@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from database.connect_to_db import engine, text
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "2000"))
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def stream_query(query: str, params: dict = None):
+    # Own connection: the request session is closed before a streamed body is sent.
+    # stream_results keeps a named cursor open so only one batch is in memory.
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE).execute(
+            text(query), params or {}
+        )
+        for partition in result.mappings().partitions():
+            yield partition
+
+
+def ndjson_chunks(partitions):
+    for rows in partitions:
+        yield "".join(json.dumps(dict(row), default=_json_default) + "\n" for row in rows)
+
+
+def csv_chunks(partitions):
+    buffer = io.StringIO()
+    writer = None
+    for rows in partitions:
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(buffer, fieldnames=list(row.keys()))
+                writer.writeheader()
+            writer.writerow({k: _json_default(v) if isinstance(v, (datetime, date, Decimal)) else v for k, v in row.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+
+def export_chunks(query: str, params: dict, fmt: str):
+    partitions = stream_query(query, params)
+    return csv_chunks(partitions) if fmt == "csv" else ndjson_chunks(partitions)
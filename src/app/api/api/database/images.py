@@ -0,0 +1,166 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from database.connect_to_db import AsyncSession, Session, text
+from database.etag import etag_matches
+from streaming.frame_pool import encode_jpeg
+
+try:
+    import cv2
+except ImportError:  # without OpenCV every request gets the original file
+    cv2 = None
+
+# Result images are only served from (and only recorded when inside) this directory
+IMAGE_ROOT = os.getenv("IMAGE_ROOT", "/app/shared/images")
+# Resized copies of result images, evicted least recently used first
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "/app/shared/thumbnails")
+IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", "512"))
+IMAGE_THUMBNAIL_QUALITY = int(os.getenv("IMAGE_THUMBNAIL_QUALITY", "75"))
+# A result's image is written once, so clients may reuse it without asking
+IMAGE_CACHE_CONTROL = os.getenv("IMAGE_CACHE_CONTROL", "private, max-age=86400")
+
+IMAGE_PATH_SQL = text("SELECT imagepath FROM productdefectresult WHERE resultid = :resultid")
+
+
+def image_url(resultid: int):
+    return f"/images/{resultid}"
+
+
+def resolve_image_path(path: str):
+    # Real path of an image under IMAGE_ROOT, None for anything else (imagepath
+    # can come from an unauthenticated live push)
+    if not path:
+        return None
+    root = os.path.realpath(IMAGE_ROOT)
+    real = os.path.realpath(path.strip())
+    if os.path.commonpath([root, real]) != root:
+        return None
+    return real
+
+
+class ImageDB:
+    def get_image_path(self, resultid: int, db: Session):
+        row = db.execute(IMAGE_PATH_SQL, {"resultid": resultid}).first()
+        return row.imagepath.strip() if row and row.imagepath else None
+
+
+class AsyncImageDB(ImageDB):
+    async def get_image_path(self, resultid: int, db: AsyncSession):
+        row = (await db.execute(IMAGE_PATH_SQL, {"resultid": resultid})).first()
+        return row.imagepath.strip() if row and row.imagepath else None
+
+
+class ThumbnailCache:
+    # Files are named after the source path, mtime, size and width, so a
+    # replaced source never serves a stale thumbnail. When there is nothing to
+    # gain from resizing, an empty .orig file records that instead, so the
+    # original is not decoded again on every request. A hit bumps the file's
+    # atime (explicitly, noatime mounts included); eviction removes the oldest
+    # atimes until the directory is back under 90% of the budget, sparing files
+    # used in the last minute that may still be in flight as a response.
+    def __init__(self, directory: str = IMAGE_CACHE_DIR, max_bytes: int = IMAGE_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = None
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    def get(self, source: str, key: str, width: int):
+        # Thumbnail path, or None when the original should be served
+        if cv2 is None:
+            return None
+        path = os.path.join(self.directory, key[:2], key + ".jpg")
+        marker = os.path.join(self.directory, key[:2], key + ".orig")
+        for cached in (path, marker):
+            try:
+                stat = os.stat(cached)
+                os.utime(cached, ns=(time.time_ns(), stat.st_mtime_ns))
+                self.hits += 1
+                return path if cached == path else None
+            except FileNotFoundError:
+                pass
+        self.misses += 1
+        jpeg = self._render(source, width)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if jpeg is None:
+            open(marker, "wb").close()
+            return None
+        partial = f"{path}.{uuid.uuid4().hex}.part"
+        with open(partial, "wb") as f:
+            f.write(jpeg)
+        os.replace(partial, path)
+        with self._lock:
+            if self.size is None:
+                self.size = sum(size for _, size, _ in self._entries())
+            else:
+                self.size += len(jpeg)
+            if self.size > self.max_bytes:
+                self._evict()
+        return path
+
+    @staticmethod
+    def _render(source: str, width: int):
+        image = cv2.imread(source, cv2.IMREAD_COLOR)
+        # Nothing to gain when the original is already that small
+        if image is None or image.shape[1] <= width:
+            return None
+        return encode_jpeg(image, width, IMAGE_THUMBNAIL_QUALITY)
+
+    def _entries(self):
+        for folder in os.scandir(self.directory):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                if entry.name.endswith((".jpg", ".orig")):
+                    stat = entry.stat()
+                    yield stat.st_atime_ns, stat.st_size, entry.path
+
+    def _evict(self):
+        target = self.max_bytes * 0.9
+        recent = time.time_ns() - 60 * 10**9
+        for used, size, path in sorted(self._entries()):
+            if self.size <= target or used > recent:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self.size -= size
+            self.evicted += 1
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evicted": self.evicted, "bytes": self.size}
+
+
+thumbnail_cache = ThumbnailCache()
+
+
+def image_response(request: Request, source: str, width: int = None):
+    # Raises FileNotFoundError when the result's image is gone from disk or
+    # lies outside IMAGE_ROOT
+    source = resolve_image_path(source)
+    if source is None:
+        raise FileNotFoundError("Image outside IMAGE_ROOT")
+    stat = os.stat(source)
+    width = max(16, width - width % 16) if width else None
+    key = hashlib.sha1(f"{source}:{stat.st_mtime_ns}:{stat.st_size}:{width or 0}".encode()).hexdigest()
+    headers = {"ETag": f'"{key[:32]}"', "Cache-Control": IMAGE_CACHE_CONTROL}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    path = None
+    if width:
+        try:
+            path = thumbnail_cache.get(source, key, width)
+        except OSError as e:
+            logging.error(f"[Images] Thumbnail for {source} not cached: {e}")
+    # FileResponse streams the file in chunks and answers Range / If-Range
+    if path:
+        return FileResponse(path, media_type="image/jpeg", headers=headers)
+    return FileResponse(source, headers=headers)
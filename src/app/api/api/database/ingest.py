@@ -0,0 +1,266 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import re
+import uuid
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import DBAPIError, OperationalError
+from database.connect_to_db import engine, text, SQLAlchemyError
+from database.bulk import bulk_insert
+from database.live_inspection import get_camera_metadata
+from database.images import resolve_image_path
+
+# Inspection results pushed to ws_main are buffered and written to
+# productdefectresult in micro-batches instead of one commit per frame
+LIVE_INGEST = os.getenv("LIVE_INGEST", "true").lower() in ("1", "true", "yes")
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "1"))
+# Batches that could not be written are appended here as NDJSON and replayed
+# on the next successful flush. Rows the database rejects, and spool files that
+# still fail after INGEST_REPLAY_ATTEMPTS replays, are moved to spool-dead-*;
+# once fixed, renaming one back to spool-*.ndjson replays it
+INGEST_SPOOL_DIR = os.getenv("INGEST_SPOOL_DIR", "/app/shared/ingest-spool")
+INGEST_REPLAY_ATTEMPTS = int(os.getenv("INGEST_REPLAY_ATTEMPTS", "5"))
+# Tries, one flush interval apart, to find the stored row an NG clip belongs to
+INGEST_CLIP_ATTEMPTS = int(os.getenv("INGEST_CLIP_ATTEMPTS", "5"))
+RETRY_RE = re.compile(r"spool-retry-(\d+)-")
+
+
+def parse_defect_time(camera_id: str, value):
+    # The column is timestamp without time zone, which would drop an offset
+    # rather than apply it, so aware times are converted to local time first
+    if not value:
+        return datetime.now()
+    try:
+        if isinstance(value, (int, float)):
+            parsed = datetime.fromtimestamp(value)
+        else:
+            parsed = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    except (ValueError, OverflowError, OSError):
+        logging.warning(f"[Ingest] Invalid defectTime from {camera_id} replaced by receive time: {value!r}")
+        return datetime.now()
+    return parsed.astimezone().replace(tzinfo=None) if parsed.tzinfo else parsed
+
+
+def is_unavailable(e: SQLAlchemyError):
+    return isinstance(e, OperationalError) or (isinstance(e, DBAPIError) and e.connection_invalidated)
+
+
+def result_row(camera_id: str, data: dict, metadata: dict = None):
+    # Only pushes carrying a verdict are stored; plain frames are video only
+    status = data.get("status")
+    if not status:
+        return None
+    inspection = (metadata or {}).get("currentInspection") or {}
+    image_path = data.get("imagePath")
+    if image_path and resolve_image_path(image_path) is None:
+        logging.warning(f"[Ingest] imagePath outside IMAGE_ROOT dropped for {camera_id}: {image_path}")
+        image_path = None
+    return {
+        "prodid": data.get("productId") or inspection.get("productId"),
+        "prodname": data.get("productName") or inspection.get("productName"),
+        "defectid": data.get("defectId"),
+        "defecttype": data.get("defectType"),
+        "cameraid": camera_id,
+        "defecttime": parse_defect_time(camera_id, data.get("defectTime")),
+        "imagepath": image_path,
+        "clippath": data.get("clipPath"),
+        "prodstatus": status,
+    }
+
+
+async def ingest_push(camera_id: str, data: dict):
+    # Never raises: the row is buffered (and spooled if the database is down)
+    # even when the product has to be filled in from metadata that cannot load.
+    # Returns the buffered row, None when nothing is stored
+    if not LIVE_INGEST or not data.get("status"):
+        return None
+    metadata = None
+    if not (data.get("productId") and data.get("productName")):
+        try:
+            metadata = await get_camera_metadata(camera_id)
+        except (SQLAlchemyError, OSError) as e:
+            logging.warning(f"[Ingest] Metadata for {camera_id} unavailable, storing result without it: {e}")
+    row = result_row(camera_id, data, metadata)
+    ingest_writer.add(row)
+    return row
+
+
+def write_results(rows: list):
+    with engine.begin() as conn:
+        return bulk_insert(conn, "productdefectresult", rows)
+
+
+def update_clip_path(row: dict, path: str):
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            UPDATE public.productdefectresult SET clippath = :path
+            WHERE cameraid = :cameraid AND defecttime = :defecttime AND prodstatus = :prodstatus AND clippath IS NULL
+        """), {"path": path, "cameraid": row["cameraid"], "defecttime": row["defecttime"],
+              "prodstatus": row["prodstatus"]}).rowcount
+
+
+def write_each(rows: list):
+    # One savepoint per row so a row the database rejects does not take the
+    # rest of the batch with it; returns the rejected rows
+    rejected = []
+    with engine.begin() as conn:
+        for row in rows:
+            try:
+                with conn.begin_nested():
+                    bulk_insert(conn, "productdefectresult", [row])
+            except SQLAlchemyError as e:
+                if is_unavailable(e):
+                    raise
+                logging.error(f"[Ingest] Result from {row.get('cameraid')} rejected: {getattr(e, 'orig', e)}")
+                rejected.append(row)
+    return rejected
+
+
+class IngestWriter:
+    def __init__(self):
+        self.buffer = []
+        self.written = 0
+        self.spooled = 0
+        self.dead = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._spool_path = os.path.join(INGEST_SPOOL_DIR, f"spool-{os.getpid()}.ndjson")
+
+    def start(self):
+        if LIVE_INGEST and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    def add(self, row: dict):
+        if not LIVE_INGEST or row is None:
+            return
+        self.buffer.append(row)
+        if len(self.buffer) >= INGEST_BATCH_SIZE:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), INGEST_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        rows, self.buffer = self.buffer, []
+        if not await run_in_threadpool(self._write, rows):
+            logging.error(f"[Ingest] {len(rows)} results spooled")
+            await run_in_threadpool(self._spool, rows)
+            return
+        await run_in_threadpool(self._replay)
+
+    async def attach_clip(self, row: dict, path: str):
+        # An NG clip is written STREAM_CLIP_POST seconds after its result was
+        # buffered. A row still in the buffer takes the path as it is; a stored
+        # one is updated, once its batch has committed. Never raises
+        if row is None:
+            return
+        row["clippath"] = path
+        if any(buffered is row for buffered in self.buffer):
+            return
+        for _ in range(INGEST_CLIP_ATTEMPTS):
+            try:
+                if await run_in_threadpool(update_clip_path, row, path):
+                    return
+            except SQLAlchemyError as e:
+                logging.warning(f"[Ingest] Clip path not stored yet: {getattr(e, 'orig', e)}")
+            await asyncio.sleep(INGEST_FLUSH_INTERVAL)
+        logging.warning(f"[Ingest] No stored result for clip {path}, left unlinked")
+
+    def _write(self, rows: list):
+        # False only when the database is unavailable; rows it rejects as
+        # invalid are dead-lettered instead, since a retry would fail again
+        try:
+            write_results(rows)
+            self.written += len(rows)
+            return True
+        except SQLAlchemyError as e:
+            if is_unavailable(e):
+                logging.error(f"[Ingest] Database unavailable: {getattr(e, 'orig', e)}")
+                return False
+            logging.warning(f"[Ingest] Batch of {len(rows)} rejected, writing row by row: {getattr(e, 'orig', e)}")
+        try:
+            rejected = write_each(rows)
+        except SQLAlchemyError as e:
+            logging.error(f"[Ingest] Row by row write failed: {getattr(e, 'orig', e)}")
+            return False
+        self._dead_letter([json.dumps(row, default=str) for row in rejected])
+        self.written += len(rows) - len(rejected)
+        return True
+
+    def _spool(self, rows: list):
+        self._append(self._spool_path, [json.dumps(row, default=str) for row in rows])
+        self.spooled += len(rows)
+
+    def _dead_letter(self, lines: list):
+        if lines:
+            self._append(os.path.join(INGEST_SPOOL_DIR, f"spool-dead-{os.getpid()}.ndjson"), lines)
+            self.dead += len(lines)
+
+    def _append(self, path: str, lines: list):
+        os.makedirs(INGEST_SPOOL_DIR, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for line in lines:
+                f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _replay(self):
+        # Claim each spool file by renaming it so concurrent workers never replay
+        # the same file twice
+        for path in sorted(glob.glob(os.path.join(INGEST_SPOOL_DIR, "spool-*.ndjson"))):
+            name = os.path.basename(path)
+            if name.startswith("spool-dead-"):
+                continue
+            claimed = f"{path}.replay-{os.getpid()}"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            rows, unreadable = [], []
+            with open(claimed, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        rows.append(json.loads(line))
+                    except ValueError:
+                        unreadable.append(line.rstrip("\n"))
+            self._dead_letter(unreadable)
+            if self._write(rows):
+                os.remove(claimed)
+                logging.info(f"[Ingest] Replayed {len(rows)} spooled results from {name}")
+                continue
+            # Hand it back under a fresh name, the original may be in use again.
+            # The database went away again, so the other files wait for the next flush
+            retry = RETRY_RE.match(name)
+            attempt = (int(retry[1]) if retry else 0) + 1
+            if attempt >= INGEST_REPLAY_ATTEMPTS:
+                logging.error(f"[Ingest] {name} failed {attempt} replays, moved to spool-dead")
+                os.rename(claimed, os.path.join(INGEST_SPOOL_DIR, f"spool-dead-{uuid.uuid4().hex}.ndjson"))
+            else:
+                os.rename(claimed, os.path.join(INGEST_SPOOL_DIR, f"spool-retry-{attempt}-{uuid.uuid4().hex}.ndjson"))
+            return
+
+    def stats(self):
+        return {"buffered": len(self.buffer), "written": self.written, "spooled": self.spooled, "dead": self.dead}
+
+
+ingest_writer = IngestWriter()
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import os
+import uuid
+from database.connect_to_db import DATABASE_URL, DB_APPLICATION_NAME
+from database.live_inspection import (
+    LIVE_RESULT_KEYS,
+    LiveBroadcaster,
+    broadcaster,
+    decode_live_image,
+    encode_binary_frame,
+    parse_live_frame,
+)
+
+# How a pushed frame reaches sockets held by other workers or hosts:
+#   memory   - only this process (single worker)
+#   postgres - latest frame per camera in an unlogged table + NOTIFY live_frame
+LIVE_BROKER = os.getenv("LIVE_BROKER", "memory").lower()
+LIVE_BROKER_CHANNEL = os.getenv("LIVE_BROKER_CHANNEL", "live_frame")
+LIVE_BROKER_RECONNECT = float(os.getenv("LIVE_BROKER_RECONNECT", "2"))
+# How often each worker records which cameras it holds sockets for; a record
+# not renewed within three intervals counts as gone
+LIVE_BROKER_PRESENCE = float(os.getenv("LIVE_BROKER_PRESENCE", "2"))
+# Upper bound on frame writes per camera (0 = every push); pushes in between
+# only replace the frame that goes out in the next slot
+LIVE_BROKER_MAX_FPS = float(os.getenv("LIVE_BROKER_MAX_FPS", "10"))
+
+
+class MemoryBroker:
+    # Whether a push can be skipped when this process has no socket on the camera
+    local_only = True
+
+    def __init__(self, local: LiveBroadcaster):
+        self.local = local
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def publish(self, camera_id: str, data: dict):
+        if self.local.publish(camera_id, data):
+            return {"status": "queued", **self.local.stats(camera_id)}
+        return {"status": "no_active_socket"}
+
+
+class PostgresBroker(MemoryBroker):
+    # NOTIFY payloads are capped at 8000 bytes, so the frame itself goes into an
+    # unlogged table (one row per camera, overwritten) and the notification only
+    # carries the camera id. A worker with no sockets on that camera ignores it;
+    # one that has them reads the row, which always holds the newest frame.
+    # Workers list the cameras they hold sockets for in live_subscribers, and a
+    # push for a camera nobody watches is not written at all.
+    local_only = False
+
+    def __init__(self, local: LiveBroadcaster, dsn: str = DATABASE_URL):
+        super().__init__(local)
+        self.dsn = dsn
+        self.pool = None
+        self.listener = None
+        self.worker = uuid.uuid4().hex
+        self.watched = set()
+        self._supervisor = None
+        self._presence = None
+        self._dirty = set()
+        self._fetchers = {}
+        self._next_write = {}
+        self._pending = {}
+        self._writers = set()  # delayed writes, referenced until they finish
+
+    async def start(self):
+        import asyncpg
+
+        settings = {"application_name": f"{DB_APPLICATION_NAME}-broker"}
+        # live_frame and live_subscribers are created by database/migrations.py
+        self.pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=2, server_settings=settings)
+        self._supervisor = asyncio.create_task(self._listen_forever(settings))
+        self._presence = asyncio.create_task(self._presence_forever())
+
+    async def stop(self):
+        import asyncpg
+
+        for task in (self._supervisor, self._presence, *self._fetchers.values(), *self._writers):
+            if task:
+                task.cancel()
+        if self.listener and not self.listener.is_closed():
+            await self.listener.close()
+        if self.pool:
+            try:
+                await self.pool.execute("DELETE FROM public.live_subscribers WHERE worker = $1", self.worker)
+            except (OSError, asyncpg.PostgresError) as e:
+                logging.warning(f"[Broker] Presence not cleared: {e}")
+            await self.pool.close()
+
+    async def publish(self, camera_id: str, data: dict):
+        if camera_id not in self.watched and not self.local.clients(camera_id):
+            return {"status": "no_active_socket"}
+        results = {key: data[key] for key in LIVE_RESULT_KEYS if key in data}
+        frame = encode_binary_frame(results, decode_live_image(data.get("liveStream")))
+        wait = self._next_write.get(camera_id, 0) - asyncio.get_running_loop().time()
+        if wait > 0:
+            if camera_id not in self._pending:
+                task = asyncio.create_task(self._write_later(camera_id, wait))
+                self._writers.add(task)
+                task.add_done_callback(self._writers.discard)
+            self._pending[camera_id] = frame
+            return {"status": "throttled", **self.local.stats(camera_id)}
+        await self._write(camera_id, frame)
+        return {"status": "published", **self.local.stats(camera_id)}
+
+    async def _write_later(self, camera_id: str, delay: float):
+        await asyncio.sleep(delay)
+        frame = self._pending.pop(camera_id, None)
+        try:
+            await self._write(camera_id, frame)
+        except Exception as e:
+            logging.error(f"[Broker] Frame for {camera_id} not published: {e}")
+
+    async def _write(self, camera_id: str, frame: bytes):
+        if LIVE_BROKER_MAX_FPS > 0:
+            self._next_write[camera_id] = asyncio.get_running_loop().time() + 1 / LIVE_BROKER_MAX_FPS
+        await self.pool.execute("""
+            WITH up AS (
+                INSERT INTO public.live_frame (cameraid, frame, updated_at) VALUES ($1, $2, now())
+                ON CONFLICT (cameraid) DO UPDATE SET frame = EXCLUDED.frame, updated_at = now()
+                RETURNING cameraid
+            )
+            SELECT pg_notify($3, cameraid) FROM up
+        """, camera_id, frame, LIVE_BROKER_CHANNEL)
+
+    async def _presence_forever(self):
+        import asyncpg
+
+        while True:
+            cameras = [camera_id for camera_id in list(self.local.subscribers) if self.local.clients(camera_id)]
+            try:
+                async with self.pool.acquire() as conn, conn.transaction():
+                    await conn.execute("""
+                        DELETE FROM public.live_subscribers
+                        WHERE (worker = $1 AND NOT cameraid = ANY($2::text[]))
+                           OR seen_at < now() - make_interval(secs => $3)
+                    """, self.worker, cameras, LIVE_BROKER_PRESENCE * 3)
+                    await conn.execute("""
+                        INSERT INTO public.live_subscribers (worker, cameraid, seen_at)
+                        SELECT $1, unnest($2::text[]), now()
+                        ON CONFLICT (worker, cameraid) DO UPDATE SET seen_at = now()
+                    """, self.worker, cameras)
+                    rows = await conn.fetch("SELECT DISTINCT cameraid FROM public.live_subscribers")
+                self.watched = {row["cameraid"] for row in rows}
+            except (OSError, asyncpg.PostgresError) as e:
+                logging.warning(f"[Broker] Presence not updated: {e}")
+            await asyncio.sleep(LIVE_BROKER_PRESENCE)
+
+    async def _listen_forever(self, settings: dict):
+        import asyncpg
+
+        while True:
+            try:
+                self.listener = await asyncpg.connect(self.dsn, server_settings=settings)
+                await self.listener.add_listener(LIVE_BROKER_CHANNEL, self._on_notify)
+                while not self.listener.is_closed():
+                    await asyncio.sleep(LIVE_BROKER_RECONNECT)
+            except (OSError, asyncpg.PostgresError) as e:
+                logging.warning(f"[Broker] Listener lost, reconnecting: {e}")
+            await asyncio.sleep(LIVE_BROKER_RECONNECT)
+
+    def _on_notify(self, connection, pid, channel, camera_id):
+        if not self.local.clients(camera_id):
+            return
+        # A burst of notifications for one camera collapses into one read of the
+        # latest row
+        self._dirty.add(camera_id)
+        if camera_id not in self._fetchers:
+            self._fetchers[camera_id] = asyncio.create_task(self._fetch(camera_id))
+
+    async def _fetch(self, camera_id: str):
+        try:
+            while camera_id in self._dirty:
+                self._dirty.discard(camera_id)
+                frame = await self.pool.fetchval("SELECT frame FROM public.live_frame WHERE cameraid = $1", camera_id)
+                if frame is not None:
+                    self.local.publish(camera_id, parse_live_frame(frame))
+        except Exception as e:
+            logging.error(f"[Broker] Frame for {camera_id} not delivered: {e}")
+        finally:
+            self._fetchers.pop(camera_id, None)
+
+
+def create_live_broker(local: LiveBroadcaster = broadcaster):
+    if LIVE_BROKER == "postgres":
+        return PostgresBroker(local)
+    if LIVE_BROKER != "memory":
+        logging.warning(f"[Broker] Unknown LIVE_BROKER={LIVE_BROKER}, using memory")
+    return MemoryBroker(local)
+
+
+live_broker = create_live_broker()
@@ -1,94 +1,320 @@
+import base64
+import inspect
 import logging
+import json
+import os
+import struct
 from fastapi import WebSocket, WebSocketDisconnect
-from database.connect_to_db import Session, text
+from fastapi.concurrency import run_in_threadpool
+from database.connect_to_db import SessionLocal, AsyncSessionLocal, DB_ASYNC, DB_POOL_SIZE, text
+from database.cache import master_data_cache
 from typing import Dict, List
 import asyncio
+from collections import deque
 
-# Global maps for sockets and incoming updates
-active_websockets: Dict[str, List[WebSocket]] = {}
-pending_updates: Dict[str, asyncio.Queue] = {}
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # optional, several times faster on the ingest path
+    _json_loads = json.loads
+
+# Pushed updates waiting for a camera's pump. 1 = latest frame wins.
+LIVE_MAILBOX_SIZE = int(os.getenv("LIVE_MAILBOX_SIZE", "1"))
+# Per-socket buffer of payloads not yet sent. When it is full the oldest payload
+# is dropped, so a slow client falls back to latest-only delivery.
+LIVE_SUBSCRIBER_BUFFER = int(os.getenv("LIVE_SUBSCRIBER_BUFFER", "4"))
+# A client that cannot take one payload within this many seconds is disconnected
+LIVE_SEND_TIMEOUT = float(os.getenv("LIVE_SEND_TIMEOUT", "5"))
+# Camera/product metadata sent with every frame. Writes through this process
+# invalidate it by table; the TTL bounds staleness for writes made elsewhere
+# (main.py runs in a different process, Node-RED writes results directly).
+LIVE_METADATA_TTL = float(os.getenv("LIVE_METADATA_TTL", "10"))
+LIVE_METADATA_TABLES = ("camera", "product", "prodtype", "defectsummary", "planning")
+# Metadata loads in flight at once, across all cameras
+LIVE_DB_CONCURRENCY = int(os.getenv("LIVE_DB_CONCURRENCY", str(DB_POOL_SIZE)))
+_metadata_slots = asyncio.Semaphore(LIVE_DB_CONCURRENCY)
+
+LIVE_DEFECT_SQL = text("""
+    SELECT
+        c.cameralocation AS "location",
+        c.cameraid AS "cameraId",
+        c.cameraname AS "cameraName",
+        c.camerastatus AS "status",
+        p.prodid AS "productId",
+        p.prodname AS "productName",
+        pt.prodtypeid AS "productTypeId",
+        pt.prodtype AS "productTypeName",
+        p.prodserial AS "serialNo",
+        d.resultid,
+        d.imagepath as "imagepath", 
+        d.defecttype AS "defectType",
+        p.createddate AS "productDateTime",
+        ds.prodlot AS "lotNo",
+        ds.totalng AS "totalNG",
+        NULL AS "totalPlanning",
+        NULL AS "totalPlanning",  
+        NULL AS "actualPlanning"
+    FROM public.camera c
+    INNER JOIN public.productdefectresult d ON c.cameraid = d.cameraid
+    INNER JOIN public.product p ON d.prodid = p.prodid
+    INNER JOIN public.prodtype pt ON p.prodtypeid = pt.prodtypeid
+    LEFT JOIN public.defectsummary ds ON p.prodid = ds.prodid
+    WHERE c.isdeleted = false
+    AND p.isdeleted = false
+    AND c.cameraid = :camera_id
+    ORDER BY c.cameraid, p.prodid;
+""")
+
+
+def _metadata_from_row(row):
+    if not row:
+        return None
+    return {
+        "location": row["location"],
+        "cameraId": row["cameraId"],
+        "cameraName": row["cameraName"],
+        "status": "OK" if row["status"] else "NG",
+        "lotNo": row["lotNo"],
+        "totalNG": str(row["totalNG"] if row["totalNG"] is not None else 10),
+        "totalProduct": str(row["totalPlanning"] if row["totalPlanning"] is not None else 1000),
+        "actualProduct": str(row["actualPlanning"] if row["actualPlanning"] is not None else 1000),
+        "currentInspection": {
+            "productId": row["productId"],
+            "productName": row["productName"],
+            "serialNo": row["serialNo"],
+            "productDateTime": row["productDateTime"].strftime("%Y-%m-%d %H:%M:%S") if row["productDateTime"] else None,
+        },
+    }
+
+
+def load_camera_metadata(camera_id: str):
+    with SessionLocal() as db:
+        row = db.execute(LIVE_DEFECT_SQL, {"camera_id": camera_id}).mappings().first()
+    return _metadata_from_row(row)
+
+
+async def load_camera_metadata_async(camera_id: str):
+    # Short-lived session per load: nothing is held while the socket idles, and
+    # the semaphore keeps a burst of cache misses from draining the pool
+    async with _metadata_slots:
+        if DB_ASYNC:
+            async with AsyncSessionLocal() as db:
+                row = (await db.execute(LIVE_DEFECT_SQL, {"camera_id": camera_id})).mappings().first()
+            return _metadata_from_row(row)
+        return await run_in_threadpool(load_camera_metadata, camera_id)
+
+
+async def get_camera_metadata(camera_id: str):
+    # Served from cache on the frame path; the join only runs on a miss, off the loop
+    metadata = master_data_cache.get_or_load(
+        ("live_camera_metadata", camera_id),
+        lambda: load_camera_metadata_async(camera_id),
+        LIVE_METADATA_TABLES,
+        ttl=LIVE_METADATA_TTL,
+    )
+    return await metadata if inspect.isawaitable(metadata) else metadata
 
-async def live_defect_ws_handler(websocket: WebSocket, camera_id: str, db: Session):
-    await websocket.accept()
 
-    if camera_id not in active_websockets:
-        active_websockets[camera_id] = []
-    if camera_id not in pending_updates:
-        pending_updates[camera_id] = asyncio.Queue()
+def merge_live_payload(metadata: dict, merged_data: dict):
+    if metadata is None:
+        return {"error": "No defect + planning found"}
+    return {
+        "liveStream": merged_data.get("liveStream", ""),
+        **metadata,
+        "colorDetection": merged_data.get("colorDetection", {}),
+        "typeClassification": merged_data.get("typeClassification", {}),
+        "componentDetection": merged_data.get("componentDetection", {}),
+        "objectCounting": merged_data.get("objectCounting", {}),
+        "barcodeReading": merged_data.get("barcodeReading", {}),
+    }
 
-    active_websockets[camera_id].append(websocket)
 
+def encode_binary_frame(payload: dict, image: bytes):
+    # Binary mode message: 4-byte big-endian header length, UTF-8 JSON header
+    # (the payload without liveStream), then the raw JPEG
+    header = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+    return b"".join((struct.pack(">I", len(header)), header, image))
+
+
+def decode_live_image(live_stream):
+    # Raw bytes from the binary ingest endpoint pass straight through
+    if isinstance(live_stream, (bytes, bytearray, memoryview)):
+        return live_stream
+    if not live_stream:
+        return b""
     try:
+        return base64.b64decode(live_stream)
+    except (ValueError, TypeError):
+        return b""
+
+
+LIVE_RESULT_KEYS = ("colorDetection", "typeClassification", "componentDetection", "objectCounting", "barcodeReading")
+# Optional verdict fields, stored by database/ingest.py when present
+LIVE_VERDICT_KEYS = ("status", "productId", "productName", "defectId", "defectType", "defectTime", "imagePath")
+
+
+def parse_live_results(raw):
+    results = _json_loads(raw) if raw else {}
+    if not isinstance(results, dict):
+        raise ValueError("Detection results must be a JSON object")
+    return {key: results[key] for key in LIVE_RESULT_KEYS + LIVE_VERDICT_KEYS if key in results}
+
+
+def parse_live_frame(body: bytes):
+    # Same framing as binary WebSocket messages: header length, JSON results, JPEG
+    if len(body) < 4:
+        raise ValueError("Frame too short")
+    (header_length,) = struct.unpack_from(">I", body)
+    if 4 + header_length > len(body):
+        raise ValueError("Header length exceeds frame size")
+    view = memoryview(body)
+    return {
+        **parse_live_results(bytes(view[4:4 + header_length])),
+        "liveStream": view[4 + header_length:],
+    }
+
+
+class LatestMailbox:
+    # Bounded single-consumer mailbox. put() never blocks: when full the oldest
+    # item is dropped and counted, so the consumer always resumes at the newest.
+    def __init__(self, maxsize: int = 1):
+        self._items = deque(maxlen=max(maxsize, 1))
+        self._ready = asyncio.Event()
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, item):
+        if len(self._items) == self._items.maxlen:
+            self.dropped += 1
+        self._items.append(item)
+        self.received += 1
+        self._ready.set()
+
+    async def get(self):
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.popleft()
+
+    def depth(self):
+        return len(self._items)
+
+
+class Subscriber:
+    def __init__(self, websocket: WebSocket, mode: str = "json"):
+        self.websocket = websocket
+        self.mode = mode
+        self.mailbox = LatestMailbox(LIVE_SUBSCRIBER_BUFFER)
+
+
+class LiveBroadcaster:
+    # One pump task per camera turns each pushed update into a single encoded
+    # message and fans it out to every subscriber's own buffer
+    def __init__(self):
+        self.subscribers: Dict[str, List[Subscriber]] = {}
+        self.updates: Dict[str, LatestMailbox] = {}
+        self.pumps: Dict[str, asyncio.Task] = {}
+
+    def subscribe(self, camera_id: str, websocket: WebSocket, mode: str = "json"):
+        subscriber = Subscriber(websocket, mode)
+        self.subscribers.setdefault(camera_id, []).append(subscriber)
+        if camera_id not in self.pumps:
+            self.updates[camera_id] = LatestMailbox(LIVE_MAILBOX_SIZE)
+            self.pumps[camera_id] = asyncio.create_task(self._pump(camera_id))
+        return subscriber
+
+    def unsubscribe(self, camera_id: str, subscriber: Subscriber):
+        subscribers = self.subscribers.get(camera_id, [])
+        if subscriber in subscribers:
+            subscribers.remove(subscriber)
+        if not subscribers and camera_id in self.pumps:
+            self.pumps.pop(camera_id).cancel()
+            self.updates.pop(camera_id, None)
+            self.subscribers.pop(camera_id, None)
+
+    def publish(self, camera_id: str, data: dict):
+        updates = self.updates.get(camera_id)
+        if updates is None:
+            return False
+        updates.put(data)
+        return True
+
+    def clients(self, camera_id: str):
+        return len(self.subscribers.get(camera_id, []))
+
+    def stats(self, camera_id: str):
+        updates = self.updates.get(camera_id)
+        subscribers = self.subscribers.get(camera_id, [])
+        return {
+            "clients": len(subscribers),
+            "depth": updates.depth() if updates else 0,
+            "dropped": updates.dropped if updates else 0,
+            "clientDepth": max((sub.mailbox.depth() for sub in subscribers), default=0),
+            "clientDropped": sum(sub.mailbox.dropped for sub in subscribers),
+        }
+
+    async def _pump(self, camera_id: str):
+        updates = self.updates[camera_id]
         while True:
-            # Wait for new merged data from Node-RED
-            merged_data = await pending_updates[camera_id].get()
-
-            # Run SQL to get camera/product metadata
-            sql = text("""
-                SELECT
-                    c.cameralocation AS "location",
-                    c.cameraid AS "cameraId",
-                    c.cameraname AS "cameraName",
-                    c.camerastatus AS "status",
-                    p.prodid AS "productId",
-                    p.prodname AS "productName",
-                    pt.prodtypeid AS "productTypeId",
-                    pt.prodtype AS "productTypeName",
-                    p.prodserial AS "serialNo",
-                    d.resultid,
-                    d.imagepath as "imagepath", 
-                    d.defecttype AS "defectType",
-                    p.createddate AS "productDateTime",
-                    ds.prodlot AS "lotNo",
-                    ds.totalng AS "totalNG",
-                    NULL AS "totalPlanning",
-                    NULL AS "totalPlanning",  
-                    NULL AS "actualPlanning"
-                FROM public.camera c
-                INNER JOIN public.productdefectresult d ON c.cameraid = d.cameraid
-                INNER JOIN public.product p ON d.prodid = p.prodid
-                INNER JOIN public.prodtype pt ON p.prodtypeid = pt.prodtypeid
-                LEFT JOIN public.defectsummary ds ON p.prodid = ds.prodid
-                WHERE c.isdeleted = false
-                AND p.isdeleted = false
-                AND c.cameraid = :camera_id
-                ORDER BY c.cameraid, p.prodid;
-            """)
-            row = db.execute(sql, {"camera_id": camera_id}).mappings().first()
-            if not row:
-                await websocket.send_json({"error": "No defect + planning found"})
+            merged_data = await updates.get()
+            try:
+                metadata = await get_camera_metadata(camera_id)
+            except Exception as e:
+                logging.error(f"[WebSocket] Metadata for {camera_id} failed: {e}")
                 continue
+            subscribers = self.subscribers.get(camera_id, [])
+            # Each wire format is encoded once per update and the same object is
+            # queued to every subscriber using it
+            messages = {}
+            if any(sub.mode == "json" for sub in subscribers):
+                live_stream = merged_data.get("liveStream", "")
+                if not isinstance(live_stream, str):
+                    live_stream = base64.b64encode(live_stream).decode()
+                payload = merge_live_payload(metadata, {**merged_data, "liveStream": live_stream})
+                messages["json"] = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+            if any(sub.mode == "binary" for sub in subscribers):
+                payload = merge_live_payload(metadata, merged_data)
+                payload.pop("liveStream", None)
+                messages["binary"] = encode_binary_frame(payload, decode_live_image(merged_data.get("liveStream")))
+            for subscriber in subscribers:
+                subscriber.mailbox.put(messages[subscriber.mode])
+            logging.debug(f"[WebSocket] Broadcasted to {camera_id}")
+
+
+broadcaster = LiveBroadcaster()
+
+
+async def _send_updates(subscriber: Subscriber, send):
+    while True:
+        message = await subscriber.mailbox.get()
+        await asyncio.wait_for(send(message), LIVE_SEND_TIMEOUT)
 
-            result = {
-                "liveStream": merged_data.get("liveStream", ""),
-                "location": row["location"],
-                "cameraId": row["cameraId"],
-                "cameraName": row["cameraName"],
-                "status": "OK" if row["status"] else "NG",
-                "lotNo": row["lotNo"],
-                "totalNG": str(row["totalNG"] if row["totalNG"] is not None else 10),
-                "totalProduct": str(row["totalPlanning"] if row["totalPlanning"] is not None else 1000),
-                "actualProduct": str(row["actualPlanning"] if row["actualPlanning"] is not None else 1000),
-                "currentInspection": {
-                    "productId": row["productId"],
-                    "productName": row["productName"],
-                    "serialNo": row["serialNo"],
-                    "productDateTime": row["productDateTime"].strftime("%Y-%m-%d %H:%M:%S") if row["productDateTime"] else None,
-                },
-                "colorDetection": merged_data.get("colorDetection", {}),
-                "typeClassification": merged_data.get("typeClassification", {}),
-                "componentDetection": merged_data.get("componentDetection", {}),
-                "objectCounting": merged_data.get("objectCounting", {}),
-                "barcodeReading": merged_data.get("barcodeReading", {}),
-            }
-
-            await websocket.send_json(result)
-            print(f"[WebSocket] Broadcasted to {camera_id}")
 
+async def _wait_disconnect(websocket: WebSocket):
+    # Clients send nothing we use, but only receive() notices that one has gone;
+    # otherwise a quiet camera keeps a closed socket subscribed
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+
+
+async def live_defect_ws_handler(websocket: WebSocket, camera_id: str):
+    await websocket.accept()
+    mode = "binary" if websocket.query_params.get("mode") == "binary" else "json"
+    subscriber = broadcaster.subscribe(camera_id, websocket, mode)
+    send = websocket.send_bytes if mode == "binary" else websocket.send_text
+    tasks = [asyncio.create_task(_send_updates(subscriber, send)), asyncio.create_task(_wait_disconnect(websocket))]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            task.result()
     except WebSocketDisconnect:
         logging.info(f"[WebSocket] Disconnected: live-defect/{camera_id}")
-        active_websockets[camera_id].remove(websocket)
-        if not active_websockets[camera_id]:
-            del active_websockets[camera_id]
-            del pending_updates[camera_id]
-
+    except asyncio.TimeoutError:
+        logging.warning(f"[WebSocket] Dropped slow client on live-defect/{camera_id}")
+        await websocket.close(code=1013)
+    finally:
+        for task in tasks:
+            task.cancel()
+        broadcaster.unsubscribe(camera_id, subscriber)
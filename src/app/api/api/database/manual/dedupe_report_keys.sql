@@ -0,0 +1,62 @@
+-- Removes rows that repeat the keys of the report unique indexes in
+-- database/migrations.py, which are not built while duplicates exist.
+-- Run by hand after checking the preview, e.g.
+--   psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f database/manual/dedupe_report_keys.sql
+-- then restart the API so the indexes get built. Each table is left untouched
+-- when it does not exist.
+
+-- Preview: every repeated key with its copies
+--   SELECT prodlot, prodid, defectid, COUNT(*), array_agg(totalok || '/' || totalng)
+--   FROM public.defectsummary GROUP BY 1, 2, 3 HAVING COUNT(*) > 1;
+--   SELECT productid, COUNT(*), array_agg(date || ' ' || time)
+--   FROM public.productdetail GROUP BY 1 HAVING COUNT(*) > 1;
+
+BEGIN;
+
+-- defectsummary has no id or timestamp; counts only grow during a lot, so the
+-- copy with the highest totalok + totalng is the latest report
+DO $$ BEGIN
+    IF to_regclass('public.defectsummary') IS NOT NULL THEN
+        DELETE FROM public.defectsummary d
+        USING (
+            SELECT ctid, ROW_NUMBER() OVER (
+                PARTITION BY prodlot, prodid, defectid
+                ORDER BY COALESCE(totalok, 0) + COALESCE(totalng, 0) DESC
+            ) AS copy
+            FROM public.defectsummary
+            WHERE prodlot IS NOT NULL AND prodid IS NOT NULL AND defectid IS NOT NULL
+        ) ranked
+        WHERE d.ctid = ranked.ctid AND ranked.copy > 1;
+    END IF;
+END $$;
+
+-- productdetail: the copy with the latest date and time is kept
+DO $$ BEGIN
+    IF to_regclass('public.productdetail') IS NOT NULL THEN
+        DELETE FROM public.productdetail p
+        USING (
+            SELECT ctid, ROW_NUMBER() OVER (
+                PARTITION BY productid ORDER BY date DESC, time DESC
+            ) AS copy
+            FROM public.productdetail
+            WHERE productid IS NOT NULL
+        ) ranked
+        WHERE p.ctid = ranked.ctid AND ranked.copy > 1;
+    END IF;
+END $$;
+
+-- history rows consist of the key alone, so repeated ones are identical and
+-- any one copy is kept
+DO $$ BEGIN
+    IF to_regclass('public.history') IS NOT NULL THEN
+        DELETE FROM public.history h
+        USING (
+            SELECT ctid, ROW_NUMBER() OVER (PARTITION BY productid, date, time, updatedby) AS copy
+            FROM public.history
+            WHERE productid IS NOT NULL AND date IS NOT NULL AND time IS NOT NULL AND updatedby IS NOT NULL
+        ) ranked
+        WHERE h.ctid = ranked.ctid AND ranked.copy > 1;
+    END IF;
+END $$;
+
+COMMIT;
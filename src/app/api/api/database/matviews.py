@@ -0,0 +1,69 @@
+import asyncio
+import logging
+import os
+import time
+from fastapi.concurrency import run_in_threadpool
+from database.connect_to_db import engine, text, SQLAlchemyError
+
+# Heavy dashboard aggregates are served from materialized views (created in
+# database/migrations.py) and rebuilt in the background, so a request never pays
+# for aggregating the whole history.
+MATVIEW_REFRESH_INTERVAL = float(os.getenv("MATVIEW_REFRESH_INTERVAL", "300"))
+
+MATERIALIZED_VIEWS = ("mv_good_ng_ratio", "mv_defects_camera")
+
+
+def refresh_view(name: str):
+    # Returns False when another worker holds the refresh for this view
+    started = time.monotonic()
+    with engine.begin() as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_xact_lock(hashtext(:name))"), {"name": name}).scalar():
+            return False
+        # A refresh legitimately outlives the per-request statement timeout
+        conn.execute(text("SET LOCAL statement_timeout = 0"))
+        populated = conn.execute(
+            text("SELECT ispopulated FROM pg_matviews WHERE schemaname = 'public' AND matviewname = :name"),
+            {"name": name},
+        ).scalar()
+        # CONCURRENTLY keeps readers unblocked but needs an existing snapshot
+        concurrently = "CONCURRENTLY " if populated else ""
+        conn.execute(text(f"REFRESH MATERIALIZED VIEW {concurrently}public.{name}"))
+        conn.execute(text("""
+            INSERT INTO public.mv_refresh_log (viewname, refreshed_at, duration_ms)
+            VALUES (:name, now(), :duration_ms)
+            ON CONFLICT (viewname) DO UPDATE
+            SET refreshed_at = EXCLUDED.refreshed_at, duration_ms = EXCLUDED.duration_ms
+        """), {"name": name, "duration_ms": int((time.monotonic() - started) * 1000)})
+    return True
+
+
+def refresh_materialized_views():
+    for name in MATERIALIZED_VIEWS:
+        try:
+            refresh_view(name)
+        except SQLAlchemyError as e:
+            logging.warning(f"Materialized view {name} not refreshed: {getattr(e, 'orig', e)}")
+
+
+async def matview_refresher():
+    while True:
+        await run_in_threadpool(refresh_materialized_views)
+        await asyncio.sleep(MATVIEW_REFRESH_INTERVAL)
+
+
+def staleness_headers(status: list):
+    # `status` is the mv_refresh_log row for the view served, see DashboardDB.get_view_status
+    if not status or status[0].get("refreshed_at") is None:
+        return {"X-Data-Refreshed-At": "never"}
+    row = status[0]
+    return {
+        "Age": str(max(int(row["age_seconds"]), 0)),
+        "X-Data-Refreshed-At": row["refreshed_at"].isoformat(),
+    }
+
+
+def oldest_status(*statuses: list):
+    # A response built from several views is as stale as the oldest of them
+    if any(not status or status[0].get("refreshed_at") is None for status in statuses):
+        return []
+    return min(statuses, key=lambda status: status[0]["refreshed_at"])
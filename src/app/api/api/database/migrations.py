@@ -0,0 +1,218 @@
+import logging
+import os
+import re
+from database.connect_to_db import engine, text, SQLAlchemyError
+
+# Idempotent DDL applied at startup. Indexes are built CONCURRENTLY so a deploy
+# never blocks inserts into the history tables while they build.
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+
+# A CONCURRENTLY build that failed leaves an INVALID index behind, which
+# IF NOT EXISTS would then skip forever; it is dropped and built again
+INVALID_INDEX_SQL = """
+    SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE c.oid = to_regclass(:name) AND NOT i.indisvalid
+"""
+
+# Duplicates would make a unique build fail (and leave it INVALID), so it is
+# skipped until they are removed with database/manual/dedupe_report_keys.sql
+DUPLICATE_KEY_SQL = "SELECT 1 FROM {table} GROUP BY {columns} HAVING COUNT(*) > 1 LIMIT 1"
+UNIQUE_INDEX_RE = re.compile(r"UNIQUE INDEX CONCURRENTLY IF NOT EXISTS (\w+) ON ([\w.]+) \(([^)]*)\)")
+
+
+MIGRATIONS = [
+    # Keyset paging and filters for /productdefectresults
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_productdefectresult_defecttime_resultid "
+    "ON public.productdefectresult (defecttime, resultid)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_productdefectresult_cameraid_defecttime "
+    "ON public.productdefectresult (cameraid, defecttime, resultid)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_productdefectresult_prodid_defecttime "
+    "ON public.productdefectresult (prodid, defecttime, resultid)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_defectsummary_prodlot "
+    "ON public.defectsummary (prodlot, prodid)",
+    # /planning
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_planning_startdatetime_planid "
+    "ON public.planning (startdatetime, planid)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_planning_prodlot_startdatetime "
+    "ON public.planning (prodlot, startdatetime, planid)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_planning_prodline_startdatetime "
+    "ON public.planning (prodline, startdatetime, planid)",
+    # /transaction pages transactionreport, which is a view over transaction on
+    # some installs and a table on others; whichever is not a table is skipped
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transaction_startdate_runningno "
+    "ON public.transaction (startdate, runningno)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transaction_lotno_startdate "
+    "ON public.transaction (lotno, startdate, runningno)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactionreport_startdate_runningno "
+    "ON public.transactionreport (startdate, runningno)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_transactionreport_lotno_startdate "
+    "ON public.transactionreport (lotno, startdate, runningno)",
+    # Conflict targets for the report upserts in database/report.py
+    "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_defectsummary_lot_prod_defect "
+    "ON public.defectsummary (prodlot, prodid, defectid)",
+    "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_productdetail_productid "
+    "ON public.productdetail (productid)",
+    "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ux_history_productid_date_time_updatedby "
+    "ON public.history (productid, date, time, updatedby)",
+    # Per-camera capture source for streaming/camera_stream.py
+    "ALTER TABLE public.camera ADD COLUMN IF NOT EXISTS streamurl text",
+    # NG clips saved from the camera ring buffers, see streaming/camera_stream.py
+    "ALTER TABLE public.productdefectresult ADD COLUMN IF NOT EXISTS clippath text",
+    # Hourly rollup behind the dashboard charts, see database/dashboard.py
+    """
+    CREATE TABLE IF NOT EXISTS public.dashboard_hourly_rollup (
+        hour_slot timestamp NOT NULL,
+        prodid text NOT NULL,
+        prodname text NOT NULL,
+        prodline text NOT NULL,
+        cameraid text NOT NULL,
+        defectid text NOT NULL,
+        defecttype text NOT NULL,
+        prodstatus text NOT NULL,
+        quantity bigint NOT NULL,
+        PRIMARY KEY (hour_slot, prodid, prodname, prodline, cameraid, defectid, defecttype, prodstatus)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS public.dashboard_rollup_state (
+        name text PRIMARY KEY,
+        last_resultid bigint NOT NULL DEFAULT 0,
+        refreshed_at timestamp
+    )
+    """,
+    "INSERT INTO public.dashboard_rollup_state (name) VALUES ('hourly') ON CONFLICT (name) DO NOTHING",
+    # The highest resultid seen at the last refresh and the snapshot xmax it was
+    # read under; the watermark only advances to it once that xmax is settled
+    """
+    ALTER TABLE public.dashboard_rollup_state
+        ADD COLUMN IF NOT EXISTS pending_resultid bigint,
+        ADD COLUMN IF NOT EXISTS pending_xmax xid8
+    """,
+    # Dropdown facets, maintained alongside the rollup. Seeded from the rollup
+    # on the deploy that introduces the table
+    """
+    CREATE TABLE IF NOT EXISTS public.dashboard_facets (
+        facet text NOT NULL,
+        value text NOT NULL,
+        quantity bigint NOT NULL,
+        PRIMARY KEY (facet, value)
+    )
+    """,
+    """
+    INSERT INTO public.dashboard_facets (facet, value, quantity)
+    SELECT facet, value, SUM(quantity) FROM (
+        SELECT 'product' AS facet, prodname AS value, quantity FROM public.dashboard_hourly_rollup
+        UNION ALL SELECT 'camera', cameraid, quantity FROM public.dashboard_hourly_rollup
+        UNION ALL SELECT 'line', prodline, quantity FROM public.dashboard_hourly_rollup
+    ) f
+    WHERE value <> '' AND NOT EXISTS (SELECT 1 FROM public.dashboard_facets)
+    GROUP BY facet, value
+    """,
+    # Cross-worker live frames, see database/live_broker.py. Unlogged: only the
+    # latest frame per camera matters and nothing needs to survive a crash
+    """
+    CREATE UNLOGGED TABLE IF NOT EXISTS public.live_frame (
+        cameraid text PRIMARY KEY,
+        frame bytea NOT NULL,
+        updated_at timestamptz NOT NULL DEFAULT now()
+    )
+    """,
+    """
+    CREATE UNLOGGED TABLE IF NOT EXISTS public.live_subscribers (
+        worker text NOT NULL,
+        cameraid text NOT NULL,
+        seen_at timestamptz NOT NULL DEFAULT now(),
+        PRIMARY KEY (worker, cameraid)
+    )
+    """,
+    # Materialized views refreshed by database/matviews.py. Created empty so a
+    # deploy never waits on the first aggregation; the unique indexes are what
+    # REFRESH ... CONCURRENTLY requires
+    """
+    CREATE TABLE IF NOT EXISTS public.mv_refresh_log (
+        viewname text PRIMARY KEY,
+        refreshed_at timestamptz NOT NULL,
+        duration_ms integer
+    )
+    """,
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_good_ng_ratio AS
+    SELECT
+        p.prodid,
+        COALESCE(p.prodname, '') AS prodname,
+        COALESCE(p.cameraid, '') AS cameraid,
+        COALESCE(ds.prodlot, '') AS line,
+        ds.total_ok,
+        ds.total_ng,
+        ROUND(ds.total_ok::numeric * 100 / NULLIF(ds.total_ok + ds.total_ng, 0), 2) AS ok_ratio_percent,
+        ROUND(ds.total_ng::numeric * 100 / NULLIF(ds.total_ok + ds.total_ng, 0), 2) AS ng_ratio_percent
+    FROM (
+        SELECT prodid, prodlot, SUM(totalok) AS total_ok, SUM(totalng) AS total_ng
+        FROM public.defectsummary
+        GROUP BY prodid, prodlot
+    ) ds
+    INNER JOIN (
+        SELECT DISTINCT prodid, prodname, cameraid
+        FROM public.productdefectresult
+    ) p ON ds.prodid = p.prodid
+    WITH NO DATA
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_good_ng_ratio "
+    "ON public.mv_good_ng_ratio (prodid, prodname, cameraid, line)",
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS public.mv_defects_camera AS
+    SELECT
+        DATE_TRUNC('day', pdr.defecttime) AS day_slot,
+        pdr.prodid,
+        pdr.defectid,
+        COALESCE(dt.defecttype, '') AS defecttype,
+        pdr.cameraid,
+        COALESCE(ds.prodlot, '') AS line,
+        COALESCE(cam.cameraname, '') AS cameraname,
+        ds.totalng,
+        MAX(pdr.defecttime) AS defecttime,
+        COUNT(*) AS results
+    FROM public.productdefectresult pdr
+    LEFT JOIN public.defecttype dt ON pdr.defectid = dt.defectid
+    LEFT JOIN public.camera cam ON pdr.cameraid = cam.cameraid
+    INNER JOIN public.defectsummary ds ON pdr.prodid = ds.prodid AND pdr.defectid = ds.defectid
+    WHERE ds.totalng > 0 AND pdr.defecttime IS NOT NULL
+    GROUP BY 1, 2, 3, 4, 5, 6, 7, 8
+    WITH NO DATA
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_defects_camera "
+    "ON public.mv_defects_camera (day_slot, prodid, defectid, defecttype, cameraid, line, cameraname, totalng)",
+]
+
+
+def apply_migrations():
+    if not DB_AUTO_MIGRATE:
+        return
+    try:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            # Index builds and backfills outlast the pool's DB_STATEMENT_TIMEOUT_MS;
+            # RESET restores it before the connection goes back to the pool
+            conn.execute(text("SET statement_timeout = 0"))
+            try:
+                for statement in MIGRATIONS:
+                    try:
+                        index = re.search(r"INDEX CONCURRENTLY IF NOT EXISTS (\w+)", statement)
+                        if index and conn.execute(text(INVALID_INDEX_SQL), {"name": f"public.{index[1]}"}).first():
+                            logging.warning(f"Rebuilding invalid index {index[1]}")
+                            conn.execute(text(f"DROP INDEX CONCURRENTLY public.{index[1]}"))
+                        unique = UNIQUE_INDEX_RE.search(statement)
+                        if unique and conn.execute(text("SELECT to_regclass(:name)"),
+                                                   {"name": f"public.{unique[1]}"}).scalar() is None:
+                            duplicates = DUPLICATE_KEY_SQL.format(table=unique[2], columns=unique[3])
+                            if conn.execute(text(duplicates)).first():
+                                logging.warning(f"Index {unique[1]} not built: {unique[2]} repeats ({unique[3]}), "
+                                                f"see database/manual/dedupe_report_keys.sql")
+                                continue
+                        conn.execute(text(statement))
+                    except SQLAlchemyError as e:
+                        # One missing table must not keep the API from starting
+                        logging.warning(f"Migration skipped: {statement} ({getattr(e, 'orig', e)})")
+            finally:
+                conn.execute(text("RESET statement_timeout"))
+    except SQLAlchemyError as e:
+        logging.error(f"Migrations not applied, database unavailable: {e}")
@@ -0,0 +1,147 @@
+import base64
+import json
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+class KeysetPage:
+    # Describes one table that is paged newest-first on (order_column, key_column)
+    def __init__(self, table: str, columns: list, order_column: str, key_column: str, filters: dict):
+        self.table = table
+        self.columns = columns
+        self.order_column = order_column
+        self.key_column = key_column
+        # query param -> SQL predicate binding that param
+        self.filters = filters
+
+    def select_list(self, fields: str = None):
+        if not fields:
+            return "*"
+        wanted = [f.strip().lower() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in wanted if f not in self.columns]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        # The cursor is built from the key columns, so they always come back
+        for col in (self.order_column, self.key_column):
+            if col not in wanted:
+                wanted.append(col)
+        return ", ".join(wanted)
+
+    def _where(self, filters: dict = None):
+        where = []
+        params = {}
+        for name, value in (filters or {}).items():
+            if value is None:
+                continue
+            where.append(self.filters[name])
+            params[name] = value
+        return where, params
+
+    def build_query(self, fields: str = None, cursor: str = None, limit: int = DEFAULT_PAGE_SIZE, filters: dict = None):
+        where, params = self._where(filters)
+        if cursor:
+            order_value, params["cursor_key"] = decode_cursor(cursor)
+            # Rows without an order value come first (a backward scan of the
+            # ascending indexes), so a NULL cursor still has every dated row ahead
+            if order_value is None:
+                where.append(f"({self.order_column} IS NOT NULL OR {self.key_column} < :cursor_key)")
+            else:
+                params["cursor_order"] = order_value
+                where.append(f"({self.order_column}, {self.key_column}) < (:cursor_order, :cursor_key)")
+        # One extra row tells us whether another page exists
+        params["limit"] = min(max(limit, 1), MAX_PAGE_SIZE) + 1
+        sql = f"SELECT {self.select_list(fields)} FROM {self.table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {self.order_column} DESC NULLS FIRST, {self.key_column} DESC LIMIT :limit"
+        return sql, params
+
+    def build_export_query(self, fields: str = None, filters: dict = None):
+        # Whole filtered range in chronological order, for streaming exports
+        where, params = self._where(filters)
+        sql = f"SELECT {self.select_list(fields)} FROM {self.table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {self.order_column}, {self.key_column}"
+        return sql, params
+
+    def paginate(self, rows: list, limit: int):
+        limit = min(max(limit, 1), MAX_PAGE_SIZE)
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        return rows, encode_cursor(last[self.order_column], last[self.key_column])
+
+
+def encode_cursor(order_value, key_value):
+    if isinstance(order_value, datetime):
+        order_value = {"dt": order_value.isoformat()}
+    raw = json.dumps([order_value, key_value], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        order_value, key_value = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if isinstance(order_value, dict) and "dt" in order_value:
+        order_value = datetime.fromisoformat(order_value["dt"])
+    return order_value, key_value
+
+
+PLANNING_PAGE = KeysetPage(
+    table="public.planning",
+    columns=[
+        "planid", "prodid", "prodlot", "prodline", "quantity", "startdatetime", "enddatetime",
+        "createdby", "createddate", "updatedby", "updateddate", "isdeleted",
+    ],
+    order_column="startdatetime",
+    key_column="planid",
+    filters={
+        "start": "startdatetime >= :start",
+        "end": "startdatetime < :end",
+        "lot_no": "prodlot = :lot_no",
+        "line_id": "prodline = :line_id",
+        "product_id": "prodid = :product_id",
+    },
+)
+
+TRANSACTION_PAGE = KeysetPage(
+    table="public.transactionreport",
+    columns=[
+        "runningno", "startdate", "enddate", "lotno", "productid", "productname", "quantity",
+        "createdby", "createddate", "updatedby", "updateddate",
+    ],
+    order_column="startdate",
+    key_column="runningno",
+    filters={
+        "start": "startdate >= :start",
+        "end": "startdate < :end",
+        "lot_no": "lotno = :lot_no",
+        "product_id": "productid = :product_id",
+    },
+)
+
+PRODUCT_DEFECT_RESULT_PAGE = KeysetPage(
+    table="public.productdefectresult",
+    columns=[
+        "resultid", "prodid", "prodname", "defectid", "defecttype", "cameraid",
+        "defecttime", "imagepath", "clippath", "prodstatus",
+    ],
+    order_column="defecttime",
+    key_column="resultid",
+    filters={
+        "start": "defecttime >= :start",
+        "end": "defecttime < :end",
+        "camera_id": "cameraid = :camera_id",
+        "product_id": "prodid = :product_id",
+        "defect_id": "defectid = :defect_id",
+        "status": "prodstatus = :status",
+        "lot_no": "prodid IN (SELECT prodid FROM public.defectsummary WHERE prodlot = :lot_no)",
+    },
+)
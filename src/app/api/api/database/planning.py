@@ -1,20 +1,23 @@
-from database.connect_to_db import engine, Session, text, SQLAlchemyError
+from database.connect_to_db import AsyncSession, Session, text, SQLAlchemyError
 from fastapi import HTTPException
 from datetime import datetime
 import database.schemas as schemas
+from database.pagination import PLANNING_PAGE, DEFAULT_PAGE_SIZE
+from database.cache import master_data_cache
 
 class PlanningDB:
-    def _fetch_all(self, query: str):
+    def _fetch_all(self, query: str, db: Session, params: dict = None):
         try:
-            with engine.connect() as conn:
-                result = conn.execute(text(query))
-                return [dict(row) for row in result.mappings()]
+            result = db.execute(text(query), params or {})
+            return [dict(row) for row in result.mappings()]
         except SQLAlchemyError as e:
             print(f"Database error: {e}")
             return []
 
-    def get_planning(self):
-        return self._fetch_all("SELECT * FROM public.planning")
+    def get_planning(self, db: Session, fields: str = None, cursor: str = None,
+                     limit: int = DEFAULT_PAGE_SIZE, filters: dict = None):
+        query, params = PLANNING_PAGE.build_query(fields, cursor, limit, filters)
+        return self._fetch_all(query, db, params)
 
     def add_planning(self, plan: schemas.PlanningCreate, db: Session):
         if db.execute(text("SELECT 1 FROM planning WHERE planid = :planid"),
@@ -46,6 +49,7 @@ class PlanningDB:
             # "iscreatemode": plan.iscreatemode
         })
         db.commit()
+        master_data_cache.invalidate("planning")
         return {"status": "Planning created", "planid": plan.planid}
 
     def update_planning(self, planid: str, plan: schemas.PlanningUpdate, db: Session):
@@ -74,6 +78,7 @@ class PlanningDB:
 
         db.execute(update_sql, update_fields)
         db.commit()
+        master_data_cache.invalidate("planning")
         return {"status": "Planning updated", "planid": planid}
     
     @staticmethod
@@ -83,6 +88,15 @@ class PlanningDB:
 
         db.execute(text("UPDATE planning SET isdeleted = true WHERE planid = :planid"), {"planid": planid})
         db.commit()
+        master_data_cache.invalidate("planning")
         return {"status": 200, "detail": {"message": "Planning marked as deleted", "planid": planid}}
 
 
+class AsyncPlanningDB(PlanningDB):
+    async def _fetch_all(self, query: str, db: AsyncSession, params: dict = None):
+        try:
+            result = await db.execute(text(query), params or {})
+            return [dict(row) for row in result.mappings()]
+        except SQLAlchemyError as e:
+            print(f"Database error: {e}")
+            return []
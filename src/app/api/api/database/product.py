@@ -1,8 +1,12 @@
-from database.connect_to_db import engine, Session, text, SQLAlchemyError
+from database.connect_to_db import AsyncSession, Session, text, SQLAlchemyError
 from datetime import datetime
 from fastapi import HTTPException
 from fastapi.responses import JSONResponse
 import database.schemas as schemas
+from database.cache import cached, master_data_cache
+from database.camera import CAMERA_LIST_SQL
+from database.pagination import PRODUCT_DEFECT_RESULT_PAGE, DEFAULT_PAGE_SIZE
+from database.export import export_chunks
 
 
 def error_response(code: int, message: str):
@@ -13,31 +17,59 @@ def error_response(code: int, message: str):
 
 
 class ProductDB:
-    def _fetch_all(self, query: str):
+    def _fetch_all(self, query: str, db: Session, params: dict = None):
         try:
-            with engine.connect() as conn:
-                result = conn.execute(text(query))
-                return [dict(row) for row in result.mappings()]
+            result = db.execute(text(query), params or {})
+            return [dict(row) for row in result.mappings()]
         except SQLAlchemyError as e:
             print(f"Database error: {e}")
             return []
 
-    def get_products(self):
-        return self._fetch_all("SELECT * FROM product WHERE isdeleted = false")
-    def get_product_types(self):
-        return self._fetch_all("SELECT * FROM prodtype WHERE isdeleted = false")
+    @cached("product")
+    def get_products(self, db: Session):
+        return self._fetch_all("SELECT * FROM product WHERE isdeleted = false", db)
 
-    def get_defect_types(self):
-        return self._fetch_all("SELECT * FROM defecttype WHERE isdeleted = false")
+    @cached("prodtype")
+    def get_product_types(self, db: Session):
+        return self._fetch_all("SELECT * FROM prodtype WHERE isdeleted = false", db)
 
-    def get_cameras(self):
-        return self._fetch_all("SELECT * FROM camera WHERE isdeleted = false")
+    @cached("defecttype")
+    def get_defect_types(self, db: Session):
+        return self._fetch_all("SELECT * FROM defecttype WHERE isdeleted = false", db)
 
-    def get_product_defect_results(self):
-        return self._fetch_all("SELECT * FROM productdefectresult")
+    @cached("camera")
+    def get_cameras(self, db: Session):
+        return self._fetch_all(CAMERA_LIST_SQL, db)
 
-    def get_defect_summary(self):
-        return self._fetch_all("SELECT * FROM defectsummary")
+    def get_product_defect_results(self, db: Session, fields: str = None, cursor: str = None,
+                                   limit: int = DEFAULT_PAGE_SIZE, filters: dict = None):
+        query, params = PRODUCT_DEFECT_RESULT_PAGE.build_query(fields, cursor, limit, filters)
+        return self._fetch_all(query, db, params)
+
+    def get_defect_summary(self, db: Session):
+        return self._fetch_all("SELECT * FROM defectsummary", db)
+
+    def export_product_defect_results(self, fmt: str, fields: str = None, filters: dict = None):
+        query, params = PRODUCT_DEFECT_RESULT_PAGE.build_export_query(fields, filters)
+        return export_chunks(query, params, fmt)
+
+    def export_defect_summary(self, fmt: str, lot_no: str = None, product_id: str = None):
+        query = """
+            SELECT * FROM defectsummary
+            WHERE (CAST(:lot_no AS text) IS NULL OR prodlot = :lot_no)
+            AND (CAST(:product_id AS text) IS NULL OR prodid = :product_id)
+        """
+        return export_chunks(query, {"lot_no": lot_no, "product_id": product_id}, fmt)
+
+
+class AsyncProductDB(ProductDB):
+    async def _fetch_all(self, query: str, db: AsyncSession, params: dict = None):
+        try:
+            result = await db.execute(text(query), params or {})
+            return [dict(row) for row in result.mappings()]
+        except SQLAlchemyError as e:
+            print(f"Database error: {e}")
+            return []
 
 
 class ProductService:
@@ -69,6 +101,7 @@ class ProductService:
             "createddate": product.createddate or datetime.now()
         })
         db.commit()
+        master_data_cache.invalidate("product")
         return JSONResponse(
             status_code=200,
             content={"status": 200, "detail": {"prodid": product.prodid}}
@@ -113,6 +146,7 @@ class ProductService:
         update_sql = text(f"UPDATE product SET {set_clause} WHERE prodid = :prodid")
         db.execute(update_sql, update_fields)
         db.commit()
+        master_data_cache.invalidate("product")
         return JSONResponse(
             status_code=200,
             content={"status": 200, "detail": {"prodid": prodid}}
@@ -146,6 +180,7 @@ class ProductService:
             "createddate": prodtype.createddate or datetime.now()
         })
         db.commit()
+        master_data_cache.invalidate("prodtype")
         return JSONResponse(
             status_code=200,
             content={"status": 200, "detail": {"prodtypeid": prodtype.prodtypeid}}
@@ -186,6 +221,7 @@ class ProductService:
         """)
         db.execute(update_sql, update_fields)
         db.commit()
+        master_data_cache.invalidate("prodtype")
         return JSONResponse(
             status_code=200,
             content={"status": 200, "detail": {"prodtypeid": prodtypeid}}
@@ -198,6 +234,7 @@ class ProductService:
 
         db.execute(text("UPDATE product SET isdeleted = true WHERE prodid = :prodid"), {"prodid": prodid})
         db.commit()
+        master_data_cache.invalidate("product")
         return {"status": 200, "detail": {"message": "Product marked as deleted", "prodid": prodid}}
     
     @staticmethod
@@ -207,6 +244,7 @@ class ProductService:
 
         db.execute(text("UPDATE prodtype SET isdeleted = true WHERE prodtypeid = :prodtypeid"), {"prodtypeid": prodtypeid})
         db.commit()
+        master_data_cache.invalidate("prodtype")
         return {"status": 200, "detail": {"message": "Product type marked as deleted", "prodtypeid": prodtypeid}}
 
 
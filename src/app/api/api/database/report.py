@@ -1,45 +1,78 @@
 from database.connect_to_db import engine, Session, text, SQLAlchemyError
 from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
 import database.schemas as schemas
 from datetime import datetime
+from database.cache import master_data_cache
+from database.bulk import bulk_insert
+from typing import List
+
+# Request field -> table column. defectsummary keeps only the OK/NG counts (the
+# total is their sum) and productdefectresult has no lot column; a result is
+# tied to its lot through defectsummary.prodid.
+DEFECT_SUMMARY_COLUMNS = {
+    "lotno": "prodlot",
+    "producttype": "prodid",
+    "defecttype": "defectid",
+    "ok": "totalok",
+    "ng": "totalng",
+}
+DEFECT_SUMMARY_KEY = ("prodlot", "prodid", "defectid")
+PRODUCT_RESULT_COLUMNS = {
+    "datetime": "defecttime",
+    "productid": "prodid",
+    "productname": "prodname",
+    "status": "prodstatus",
+    "defecttype": "defecttype",
+    "cameraid": "cameraid",
+}
+PRODUCT_DETAIL_COLUMNS = {
+    field: field for field in schemas.ProductDetailCreate.__fields__ if field != "history"
+}
+HISTORY_KEY = ("productid", "date", "time", "updatedby")
+
+
+def to_columns(fields: dict, columns: dict):
+    return {columns[field]: value for field, value in fields.items() if field in columns}
 
 
 class ReportDB:
+    # The single-row adds answer 409 for a key that is already stored; the
+    # bulk variants below upsert instead
     def add_report_defect(self, item: schemas.ReportDefectCreate, db: Session):
         try:
-            db.execute(text("""
-                INSERT INTO defectsummary (lotno, producttype, defecttype, total, ok, ng)
-                VALUES (:lotno, :producttype, :defecttype, :total, :ok, :ng)
-            """), item.dict(by_alias=True))
+            bulk_insert(db, "defectsummary", [to_columns(item.dict(), DEFECT_SUMMARY_COLUMNS)])
             db.commit()
+            master_data_cache.invalidate("defectsummary")
             return {"status": "DefectSummary added", "lotNo": item.lotno}
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="DefectSummary already exists")
         except SQLAlchemyError as e:
+            db.rollback()
             raise HTTPException(status_code=500, detail=str(e))
 
     def update_report_defect(self, lotno: str, item: schemas.ReportDefectUpdate, db: Session):
         try:
-            update_fields = item.dict(exclude_unset=True, by_alias=True)
+            update_fields = to_columns(item.dict(exclude_unset=True), DEFECT_SUMMARY_COLUMNS)
             if not update_fields:
                 raise HTTPException(status_code=400, detail="No fields to update")
-            update_fields["lotno"] = lotno
-            set_clause = ", ".join([f"{k} = :{k}" for k in update_fields if k != "lotno"])
+            set_clause = ", ".join([f"{k} = :{k}" for k in update_fields])
             db.execute(text(f"""
-                UPDATE defectsummary SET {set_clause} WHERE lotno = :lotno
-            """), update_fields)
+                UPDATE defectsummary SET {set_clause} WHERE prodlot = :lotno
+            """), {**update_fields, "lotno": lotno})
             db.commit()
+            master_data_cache.invalidate("defectsummary")
             return {"status": "DefectSummary updated", "lotNo": lotno}
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="DefectSummary already exists")
         except SQLAlchemyError as e:
             raise HTTPException(status_code=500, detail=str(e))
 
     def add_report_product(self, item: schemas.ReportProductCreate, db: Session):
         try:
-            db.execute(text("""
-                INSERT INTO productdefectresult (
-                    datetime, productid, productname, lotno, status, defecttype, cameraid
-                ) VALUES (
-                    :datetime, :productid, :productname, :lotno, :status, :defecttype, :cameraid
-                )
-            """), item.dict(by_alias=True))
+            bulk_insert(db, "productdefectresult", [to_columns(item.dict(), PRODUCT_RESULT_COLUMNS)])
             db.commit()
             return {"status": "ProductDefectResult added", "productId": item.productid}
         except SQLAlchemyError as e:
@@ -47,14 +80,13 @@ class ReportDB:
 
     def update_report_product(self, productid: str, item: schemas.ReportProductUpdate, db: Session):
         try:
-            update_fields = item.dict(exclude_unset=True, by_alias=True)
+            update_fields = to_columns(item.dict(exclude_unset=True), PRODUCT_RESULT_COLUMNS)
             if not update_fields:
                 raise HTTPException(status_code=400, detail="No fields to update")
-            update_fields["productid"] = productid
-            set_clause = ", ".join([f"{k} = :{k}" for k in update_fields if k != "productid"])
+            set_clause = ", ".join([f"{k} = :{k}" for k in update_fields])
             db.execute(text(f"""
-                UPDATE productdefectresult SET {set_clause} WHERE productid = :productid
-            """), update_fields)
+                UPDATE productdefectresult SET {set_clause} WHERE prodid = :productid
+            """), {**update_fields, "productid": productid})
             db.commit()
             return {"status": "ProductDefectResult updated", "productId": productid}
         except SQLAlchemyError as e:
@@ -62,24 +94,55 @@ class ReportDB:
 
     def add_product_detail(self, item: schemas.ProductDetailCreate, db: Session):
         try:
-            db.execute(text("""
-                INSERT INTO productdetail (
-                    productid, productname, serialno, date, time, lotno,
-                    defecttype, cameraid, status, comment
-                ) VALUES (
-                    :productid, :productname, :serialno, :date, :time, :lotno,
-                    :defecttype, :cameraid, :status, :comment
-                )
-            """), item.dict(exclude={"history"}, by_alias=True))
+            bulk_insert(db, "productdetail", [to_columns(item.dict(), PRODUCT_DETAIL_COLUMNS)])
+            # History entries already stored for this product are kept as they are
+            history = [{**h.dict(), "productid": item.productid} for h in item.history]
+            bulk_insert(db, "history", history, conflict=HISTORY_KEY)
+            db.commit()
+            return {"status": "ProductDetail added", "productId": item.productid}
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="ProductDetail already exists")
+        except SQLAlchemyError as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
 
-            for h in item.history:
-                db.execute(text("""
-                    INSERT INTO history (date, time, updatedby, productid)
-                    VALUES (:date, :time, :updatedby, :productid)
-                """), {**h.dict(by_alias=True), "productid": item.productid})
 
+    # Bulk variants for end-of-lot reconciliation: each list is written with
+    # multi-row INSERTs in a single transaction, so a failed batch leaves nothing
+    # behind. Re-sending a batch updates the rows it already wrote.
+    def add_report_defects(self, items: List[schemas.ReportDefectCreate], db: Session):
+        try:
+            rows = [to_columns(item.dict(), DEFECT_SUMMARY_COLUMNS) for item in items]
+            count = bulk_insert(db, "defectsummary", rows, conflict=DEFECT_SUMMARY_KEY,
+                                update=("totalok", "totalng"))
             db.commit()
-            return {"status": "ProductDetail added", "productId": item.productid}
+            master_data_cache.invalidate("defectsummary")
+            return {"status": "DefectSummary upserted", "count": count}
         except SQLAlchemyError as e:
+            db.rollback()
             raise HTTPException(status_code=500, detail=str(e))
 
+    def add_report_products(self, items: List[schemas.ReportProductCreate], db: Session):
+        try:
+            # Results are events without a natural key, so these are plain inserts
+            rows = [to_columns(item.dict(), PRODUCT_RESULT_COLUMNS) for item in items]
+            count = bulk_insert(db, "productdefectresult", rows)
+            db.commit()
+            return {"status": "ProductDefectResult added", "count": count}
+        except SQLAlchemyError as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
+
+    def add_product_details(self, items: List[schemas.ProductDetailCreate], db: Session):
+        try:
+            details = [to_columns(item.dict(), PRODUCT_DETAIL_COLUMNS) for item in items]
+            history = [{**h.dict(), "productid": item.productid} for item in items for h in item.history]
+            update = tuple(c for c in PRODUCT_DETAIL_COLUMNS.values() if c != "productid")
+            count = bulk_insert(db, "productdetail", details, conflict=("productid",), update=update)
+            bulk_insert(db, "history", history, conflict=HISTORY_KEY)
+            db.commit()
+            return {"status": "ProductDetail upserted", "count": count, "history": len(history)}
+        except SQLAlchemyError as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=str(e))
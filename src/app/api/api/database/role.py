@@ -1,18 +1,22 @@
-from database.connect_to_db import engine, Session, text, SQLAlchemyError
+from database.connect_to_db import AsyncSession, Session, text, SQLAlchemyError
 from fastapi import HTTPException
 from datetime import datetime
 import database.schemas as schemas
+from database.cache import cached, master_data_cache
 
 class RoleDB:
-    def get_roles(self):
+    def _fetch_all(self, query: str, db: Session):
         try:
-            with engine.connect() as conn:
-                result = conn.execute(text("SELECT * FROM role"))
-                return [dict(row) for row in result.mappings()]
+            result = db.execute(text(query))
+            return [dict(row) for row in result.mappings()]
         except SQLAlchemyError as e:
             print(f"Database error: {e}")
             return []
-        
+
+    @cached("role")
+    def get_roles(self, db: Session):
+        return self._fetch_all("SELECT * FROM role", db)
+
     def add_role(self, role: schemas.RoleCreate, db: Session):
         # if db.execute(text("SELECT 1 FROM role WHERE roleid = :roleid"), {"roleid": role.roleid}).first():
         #    raise HTTPException(status_code=400, detail="Role ID already exists")
@@ -35,6 +39,7 @@ class RoleDB:
             "createddate": role.createddate or datetime.now(),
         })
         db.commit()
+        master_data_cache.invalidate("role")
         query = text("SELECT roleid, createddate FROM role ORDER BY roleid DESC LIMIT 1")
         row = db.execute(query).first()
         return {"status": "Role created", "roleid": row.roleid, "createddate": row.createddate}
@@ -55,6 +60,7 @@ class RoleDB:
 
         db.execute(update_sql, update_fields)
         db.commit()
+        master_data_cache.invalidate("role")
         return {"status": "Role updated", "roleId": roleid}
     
     @staticmethod
@@ -65,8 +71,16 @@ class RoleDB:
         update_sql = text("UPDATE role SET isdeleted = true WHERE roleid = :roleid")
         db.execute(update_sql, {"roleid": roleid})
         db.commit()
+        master_data_cache.invalidate("role")
 
         return {"status": 200, "detail": {"roleid": roleid}}
 
 
-
+class AsyncRoleDB(RoleDB):
+    async def _fetch_all(self, query: str, db: AsyncSession):
+        try:
+            result = await db.execute(text(query))
+            return [dict(row) for row in result.mappings()]
+        except SQLAlchemyError as e:
+            print(f"Database error: {e}")
+            return []
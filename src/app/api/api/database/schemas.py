@@ -59,6 +59,7 @@ class CameraCreate(BaseModel):
     cameraname: str = Field(alias="cameraName")
     cameralocation: Optional[str] = Field(default=None, alias="location")
     camerastatus: Optional[bool] = Field(default=True, alias="status")
+    streamurl: Optional[str] = Field(default=None, alias="streamUrl")
     createdby: Optional[str] = Field(default=None, alias="createdBy")
     createddate: Optional[datetime] = Field(default=None, alias="createdDate")
 
@@ -66,6 +67,7 @@ class CameraUpdate(BaseModel):
     cameraname: Optional[str] = Field(default=None, alias="cameraName")
     cameralocation: Optional[str] = Field(default=None, alias="location")
     camerastatus: Optional[bool] = Field(default=None, alias="status")
+    streamurl: Optional[str] = Field(default=None, alias="streamUrl")
     updatedby: Optional[str] = Field(default=None, alias="updatedBy")
     updateddate: Optional[datetime] = Field(default_factory=datetime.now, alias="updatedDate")
 
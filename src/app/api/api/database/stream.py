@@ -1,7 +1,6 @@
 from database.connect_to_db import Session, text
-from pathlib import Path
+from database.images import image_url
 from datetime import datetime
-import base64
 
 def get_live_inspection_data(camera_id, db: Session):
     # --- Run model query (same as before) ---
@@ -88,15 +87,9 @@ def get_live_inspection_data(camera_id, db: Session):
 
     defect_data = None
     if row:
-        image_base64 = None
-        if row["imagepath"]:
-            raw_path = row["imagepath"].strip()
-            image_path = Path(raw_path)
-            if image_path.exists():
-                with image_path.open("rb") as img_file:
-                    image_base64 = base64.b64encode(img_file.read()).decode("utf-8")
+        # The image itself is fetched from /images/{resultid} (thumbnails via ?width=)
         defect_data = {
-            "liveStream": image_base64,
+            "imageUrl": image_url(row["resultid"]) if row["imagepath"] else None,
             "location": row["location"],
             "cameraId": row["cameraid"],
             "cameraName": row["cameraname"],
@@ -1,20 +1,22 @@
-from database.connect_to_db import engine, Session, text, SQLAlchemyError
+from database.connect_to_db import AsyncSession, Session, text, SQLAlchemyError
 from fastapi import HTTPException
 import database.schemas as schemas
+from database.pagination import TRANSACTION_PAGE, DEFAULT_PAGE_SIZE
 from datetime import datetime
 
 class TransactionDB:
-    def _fetch_all(self, query: str):
+    def _fetch_all(self, query: str, db: Session, params: dict = None):
         try:
-            with engine.connect() as conn:
-                result = conn.execute(text(query))
-                return [dict(row) for row in result.mappings()]
+            result = db.execute(text(query), params or {})
+            return [dict(row) for row in result.mappings()]
         except SQLAlchemyError as e:
             print(f"Database error: {e}")
             return []
 
-    def get_transaction(self):
-        return self._fetch_all("SELECT * FROM public.transactionreport")
+    def get_transaction(self, db: Session, fields: str = None, cursor: str = None,
+                        limit: int = DEFAULT_PAGE_SIZE, filters: dict = None):
+        query, params = TRANSACTION_PAGE.build_query(fields, cursor, limit, filters)
+        return self._fetch_all(query, db, params)
 
     def add_transaction(self, txn: schemas.TransactionCreate, db: Session):
         if db.execute(text("SELECT 1 FROM transaction WHERE runningno = :runningno"),
@@ -73,3 +75,12 @@ class TransactionDB:
         db.commit()
         return {"status": "Transaction updated", "runningNo": runningno}
 
+
+class AsyncTransactionDB(TransactionDB):
+    async def _fetch_all(self, query: str, db: AsyncSession, params: dict = None):
+        try:
+            result = await db.execute(text(query), params or {})
+            return [dict(row) for row in result.mappings()]
+        except SQLAlchemyError as e:
+            print(f"Database error: {e}")
+            return []
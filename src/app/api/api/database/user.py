@@ -1,20 +1,21 @@
-from database.connect_to_db import engine, Session, text, SQLAlchemyError
+from database.connect_to_db import AsyncSession, Session, text, SQLAlchemyError
 from fastapi import HTTPException
 import database.schemas as schemas
+from database.cache import cached, master_data_cache
 from datetime import datetime
 
 class UserDB:
-    def _fetch_all(self, query: str):
+    def _fetch_all(self, query: str, db: Session):
         try:
-            with engine.connect() as conn:
-                result = conn.execute(text(query))
-                return [dict(row) for row in result.mappings()]
+            result = db.execute(text(query))
+            return [dict(row) for row in result.mappings()]
         except SQLAlchemyError as e:
             print(f"Database error: {e}")
             return []
 
-    def get_users(self):
-        return self._fetch_all("SELECT * FROM public.\"user\" WHERE isdeleted = false")
+    @cached("user")
+    def get_users(self, db: Session):
+        return self._fetch_all("SELECT * FROM public.\"user\" WHERE isdeleted = false", db)
 
 
 class UserService:
@@ -63,6 +64,7 @@ class UserService:
             "createddate": user.createddate or datetime.now()
         })
         db.commit()
+        master_data_cache.invalidate("user")
         return {"status": "User inserted successfully", "userid": user.userid}
 
     @staticmethod
@@ -103,6 +105,7 @@ class UserService:
 
         db.execute(update_sql, update_fields)
         db.commit()
+        master_data_cache.invalidate("user")
 
         return {"status": "User updated", "userid": user.userid}
     
@@ -114,8 +117,16 @@ class UserService:
         update_sql = text('UPDATE public."user" SET isdeleted = true WHERE userid = :userid')
         db.execute(update_sql, {"userid": userid})
         db.commit()
+        master_data_cache.invalidate("user")
 
         return {"status": 200, "detail": {"userid": userid}}
 
 
-
+class AsyncUserDB(UserDB):
+    async def _fetch_all(self, query: str, db: AsyncSession):
+        try:
+            result = await db.execute(text(query))
+            return [dict(row) for row in result.mappings()]
+        except SQLAlchemyError as e:
+            print(f"Database error: {e}")
+            return []
@@ -1,25 +1,37 @@
-from fastapi import FastAPI, HTTPException, Depends, Body, WebSocket, WebSocketDisconnect
-# import asyncio
+from fastapi import FastAPI, HTTPException, Depends, Body, Query, Request, BackgroundTasks, WebSocket, WebSocketDisconnect
+import asyncio
+from typing import List, Optional
 from datetime import datetime
 from sqlalchemy.sql import text
 from database.connect_to_db import Session
-from database.user import UserDB, UserService
-from database.product import ProductDB, ProductService
-from database.connect_to_db import test_db_connection, SessionLocal
+from database.user import UserDB, AsyncUserDB, UserService
+from database.product import ProductDB, AsyncProductDB, ProductService
+from database.connect_to_db import test_db_connection, get_db, get_read_db, DB_ASYNC, run_db, get_pool_metrics
 import database.schemas as schemas
-from database.defect import DefectDB
-from database.camera import CameraDB, CameraService
-from database.planning import PlanningDB
+from database.defect import DefectDB, AsyncDefectDB
+from database.camera import CameraDB, AsyncCameraDB, CameraService
+from database.planning import PlanningDB, AsyncPlanningDB
 from database.model import DetectionModelDB
-from database.transaction import TransactionDB
+from database.transaction import TransactionDB, AsyncTransactionDB
 from database.report import ReportDB
-from database.role import RoleDB
+from database.role import RoleDB, AsyncRoleDB
 from database.permission import PermissionDB
 from database.menu import MenuDB
-from database.dashboard import DashboardDB
+from database.dashboard import DashboardDB, AsyncDashboardDB, group_facets, refresh_hourly_rollup, rollup_refresher
+from database.cache import master_data_cache
+from database.etag import conditional_response
+from database.export import EXPORT_MEDIA_TYPES
+from database.images import ImageDB, AsyncImageDB, image_response, thumbnail_cache
+from fastapi.concurrency import run_in_threadpool
+from database.migrations import apply_migrations
+from database.matviews import matview_refresher, staleness_headers, oldest_status
+from database.pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PLANNING_PAGE, TRANSACTION_PAGE, PRODUCT_DEFECT_RESULT_PAGE,
+)
 # from database.live_inspection import live_inspection_ws_handler
 # from streaming.live_stream import setup_streaming, websocket_clients
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware 
 
 app = FastAPI(
@@ -50,6 +62,18 @@ def on_startup():
     # Register the current event loop for your kafka thread to use
     setup_streaming(asyncio.get_event_loop())
 '''
+@app.on_event("startup")
+def run_migrations():
+    apply_migrations()
+
+@app.on_event("startup")
+async def start_rollup_refresher():
+    app.state.rollup_task = asyncio.create_task(rollup_refresher())
+
+@app.on_event("startup")
+async def start_matview_refresher():
+    app.state.matview_task = asyncio.create_task(matview_refresher())
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # or frontend IP 
@@ -57,23 +81,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-user_db = UserDB()
-product_db = ProductDB()
-camera_db = CameraDB()
-defect_db = DefectDB()
-role_db = RoleDB()
+user_db = AsyncUserDB() if DB_ASYNC else UserDB()
+product_db = AsyncProductDB() if DB_ASYNC else ProductDB()
+camera_db = AsyncCameraDB() if DB_ASYNC else CameraDB()
+defect_db = AsyncDefectDB() if DB_ASYNC else DefectDB()
+role_db = AsyncRoleDB() if DB_ASYNC else RoleDB()
 permission_db = PermissionDB()
 menu_db = MenuDB()
-transaction_db = TransactionDB()
-planning_db = PlanningDB()
-dashboard_db = DashboardDB()
+transaction_db = AsyncTransactionDB() if DB_ASYNC else TransactionDB()
+planning_db = AsyncPlanningDB() if DB_ASYNC else PlanningDB()
+dashboard_db = AsyncDashboardDB() if DB_ASYNC else DashboardDB()
+image_db = AsyncImageDB() if DB_ASYNC else ImageDB()
 
 @app.get("/", tags=["General"])
 def read_root():
@@ -86,17 +104,25 @@ def test_db():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics/db-pool", tags=["General"])
+def db_pool_metrics():
+    return get_pool_metrics()
+
+@app.get("/metrics/cache", tags=["General"])
+def cache_metrics():
+    return {"master_data": master_data_cache.stats(), "thumbnails": thumbnail_cache.stats()}
+
 @app.get("/users", tags=["User"])
-def users():
+async def users(request: Request, db=Depends(get_read_db)):
     try:
-        return {"users": user_db.get_users()}
+        return await conditional_response(request, "users", user_db.get_users, db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/roles", tags=["User"])
-def roles():
+async def roles(request: Request, db=Depends(get_read_db)):
     try:
-        return {"roles": role_db.get_roles()}
+        return await conditional_response(request, "roles", role_db.get_roles, db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -129,16 +155,16 @@ def update_role(roleid: str, role: schemas.RoleUpdate, db: Session = Depends(get
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/products", tags=["Product"])
-def products():
+async def products(request: Request, db=Depends(get_read_db)):
     try:
-        return {"products": product_db.get_products()}
+        return await conditional_response(request, "products", product_db.get_products, db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/product-types", tags=["ProdType"])
-def product_types():
+async def product_types(request: Request, db=Depends(get_read_db)):
     try:
-        return {"product_types": product_db.get_product_types()}
+        return await conditional_response(request, "product_types", product_db.get_product_types, db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -171,9 +197,9 @@ def update_prodtype(prodtypeid: str, prodtype: schemas.ProdTypeUpdate, db: Sessi
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/cameras", tags=["Camera"])
-def cameras():
+async def cameras(request: Request, db=Depends(get_read_db)):
     try:
-        return {"cameras": product_db.get_cameras()}
+        return await conditional_response(request, "cameras", product_db.get_cameras, db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -206,30 +232,45 @@ def update_menu_api(menuid: str, menu: schemas.MenuUpdate, db: Session = Depends
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/defecttypes", tags=["Defect"])
-def get_defect_types():
+async def get_defect_types(request: Request, db=Depends(get_read_db)):
     try:
-        return {"defect_types": defect_db.get_defect_types()}
+        return await conditional_response(request, "defect_types", defect_db.get_defect_types, db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/adddefecttype", tags=["Defect"])
-def add_defect_type(defect: schemas.DefectTypeCreate):
+def add_defect_type(defect: schemas.DefectTypeCreate, db: Session = Depends(get_db)):
     try:
-        return defect_db.add_defect_type(defect)
+        return defect_db.add_defect_type(defect, db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/updatedefecttype", tags=["Defect"])
 def update_defect_type(defectid: str, defect: schemas.DefectTypeUpdate, db: Session = Depends(get_db)):
     try:
-        return DefectDB().update_defect_type(defectid, defect)
+        return defect_db.update_defect_type(defectid, defect, db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/planning", tags=["Planning"])
-def planning():
-    try:
-        return {"planning": planning_db.get_planning()}
+async def planning(
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    start: Optional[datetime] = Query(None, alias="dateFrom"),
+    end: Optional[datetime] = Query(None, alias="dateTo"),
+    lot_no: Optional[str] = Query(None, alias="lotNo"),
+    line_id: Optional[str] = Query(None, alias="lineId"),
+    product_id: Optional[str] = Query(None, alias="productId"),
+    db=Depends(get_read_db),
+):
+    filters = {"start": start, "end": end, "lot_no": lot_no, "line_id": line_id, "product_id": product_id}
+    try:
+        rows = await run_db(planning_db.get_planning, db, fields, cursor, limit, filters)
+        rows, next_cursor = PLANNING_PAGE.paginate(rows, limit)
+        return {"planning": rows, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 @app.post("/addplanning", tags=["Planning"])
@@ -261,9 +302,23 @@ def update_detection_model(modelid: str, model: schemas.DetectionModelUpdate, db
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/transaction", tags=["Transaction"])
-def transaction():
-    try:
-        return {"transaction": transaction_db.get_transaction()}
+async def transaction(
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    start: Optional[datetime] = Query(None, alias="dateFrom"),
+    end: Optional[datetime] = Query(None, alias="dateTo"),
+    lot_no: Optional[str] = Query(None, alias="lotNo"),
+    product_id: Optional[str] = Query(None, alias="productId"),
+    db=Depends(get_read_db),
+):
+    filters = {"start": start, "end": end, "lot_no": lot_no, "product_id": product_id}
+    try:
+        rows = await run_db(transaction_db.get_transaction, db, fields, cursor, limit, filters)
+        rows, next_cursor = TRANSACTION_PAGE.paginate(rows, limit)
+        return {"transaction": rows, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -282,23 +337,110 @@ def update_transaction(runningno: int, txn: schemas.TransactionUpdate, db: Sessi
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/productdefectresults", tags=["Report"])
-def product_defect_results():
-    try:
-        return {"product_defect_results": product_db.get_product_defect_results()}
+async def product_defect_results(
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    start: Optional[datetime] = Query(None, alias="dateFrom"),
+    end: Optional[datetime] = Query(None, alias="dateTo"),
+    camera_id: Optional[str] = Query(None, alias="cameraId"),
+    lot_no: Optional[str] = Query(None, alias="lotNo"),
+    product_id: Optional[str] = Query(None, alias="productId"),
+    defect_id: Optional[str] = Query(None, alias="defectTypeId"),
+    status: Optional[str] = None,
+    db=Depends(get_read_db),
+):
+    filters = {
+        "start": start, "end": end, "camera_id": camera_id, "lot_no": lot_no,
+        "product_id": product_id, "defect_id": defect_id, "status": status,
+    }
+    try:
+        rows = await run_db(product_db.get_product_defect_results, db, fields, cursor, limit, filters)
+        rows, next_cursor = PRODUCT_DEFECT_RESULT_PAGE.paginate(rows, limit)
+        return {"product_defect_results": rows, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/defectsummary", tags=["Report"])
-def defect_summary():
-    try:
-        return {"defect_summary": product_db.get_defect_summary()}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def defect_summary(db=Depends(get_read_db)):
+    try:
+        return {"defect_summary": await run_db(product_db.get_defect_summary, db)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/productdefectresults/export", tags=["Report"])
+def export_product_defect_results(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    fields: Optional[str] = None,
+    start: Optional[datetime] = Query(None, alias="dateFrom"),
+    end: Optional[datetime] = Query(None, alias="dateTo"),
+    camera_id: Optional[str] = Query(None, alias="cameraId"),
+    lot_no: Optional[str] = Query(None, alias="lotNo"),
+    product_id: Optional[str] = Query(None, alias="productId"),
+    defect_id: Optional[str] = Query(None, alias="defectTypeId"),
+    status: Optional[str] = None,
+):
+    filters = {
+        "start": start, "end": end, "camera_id": camera_id, "lot_no": lot_no,
+        "product_id": product_id, "defect_id": defect_id, "status": status,
+    }
+    try:
+        chunks = product_db.export_product_defect_results(format, fields, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="productdefectresult.{format}"'},
+    )
+
+@app.get("/defectsummary/export", tags=["Report"])
+def export_defect_summary(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    lot_no: Optional[str] = Query(None, alias="lotNo"),
+    product_id: Optional[str] = Query(None, alias="productId"),
+):
+    return StreamingResponse(
+        product_db.export_defect_summary(format, lot_no, product_id),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="defectsummary.{format}"'},
+    )
+
+@app.get("/images/{resultid}", tags=["Report"])
+async def result_image(
+    resultid: int,
+    request: Request,
+    width: Optional[int] = Query(None, ge=16, le=4096),  # thumbnail width; original if omitted
+    db=Depends(get_read_db),
+):
+    try:
+        source = await run_db(image_db.get_image_path, resultid, db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not source:
+        raise HTTPException(status_code=404, detail="Image not found")
+    try:
+        return await run_in_threadpool(image_response, request, source, width)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image file not found")
 
 @app.post("/addreportdefect", tags=["Report"])
 def add_report_defect(item: schemas.ReportDefectCreate, db: Session = Depends(get_db)):
     try:
         return ReportDB().add_report_defect(item, db)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/addreportdefects", tags=["Report"])
+def add_report_defects(items: List[schemas.ReportDefectCreate], db: Session = Depends(get_db)):
+    try:
+        return ReportDB().add_report_defects(items, db)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -306,13 +448,32 @@ def add_report_defect(item: schemas.ReportDefectCreate, db: Session = Depends(ge
 def update_report_defect(lotno: str, item: schemas.ReportDefectUpdate, db: Session = Depends(get_db)):
     try:
         return ReportDB().update_report_defect(lotno, item, db)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/addreportproduct", tags=["Report"])
-def add_report_product(item: schemas.ReportProductCreate, db: Session = Depends(get_db)):
+def add_report_product(item: schemas.ReportProductCreate, background_tasks: BackgroundTasks,
+                       db: Session = Depends(get_db)):
+    try:
+        result = ReportDB().add_report_product(item, db)
+        background_tasks.add_task(refresh_hourly_rollup)
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/addreportproducts", tags=["Report"])
+def add_report_products(items: List[schemas.ReportProductCreate], background_tasks: BackgroundTasks,
+                        db: Session = Depends(get_db)):
     try:
-        return ReportDB().add_report_product(item, db)
+        result = ReportDB().add_report_products(items, db)
+        background_tasks.add_task(refresh_hourly_rollup)
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -320,6 +481,8 @@ def add_report_product(item: schemas.ReportProductCreate, db: Session = Depends(
 def update_report_product(productid: str, item: schemas.ReportProductUpdate, db: Session = Depends(get_db)):
     try:
         return ReportDB().update_report_product(productid, item, db)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -327,6 +490,17 @@ def update_report_product(productid: str, item: schemas.ReportProductUpdate, db:
 def add_product_detail(item: schemas.ProductDetailCreate, db: Session = Depends(get_db)):
     try:
         return ReportDB().add_product_detail(item, db)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/addproductdetails", tags=["Report"])
+def add_product_details(items: List[schemas.ProductDetailCreate], db: Session = Depends(get_db)):
+    try:
+        return ReportDB().add_product_details(items, db)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -382,7 +556,7 @@ def delete_prodtype_api(prodtypeid: str, db: Session = Depends(get_db)):
 @app.delete("/deletedefecttype", tags=["Defect"])
 def delete_defecttype_api(defectid: str, db: Session = Depends(get_db)):
     try:
-        return DefectDB().delete_defecttype(defectid, db)
+        return defect_db.delete_defecttype(defectid, db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -426,53 +600,112 @@ def delete_model_api(modelid: str, db: Session = Depends(get_db)):
 #     return result
 
 
-@app.get("/defects-camera")
-def get_defects_with_ng_gt_zero(start: datetime, end: datetime, db: Session = Depends(get_db)):
-  try:
-      return dashboard_db.get_defects_with_ng_gt_zero(db)
-  except Exception as e:
-      raise HTTPException(status_code=500, detail=str(e))
-  
-
-# @app.get("/good-ng-ratio")
-# def get_good_ng(start: datetime, end: datetime, db : Session = Depends(get_db)):
-#     try:
-#         return dashboard_db.get_good_ng(db)
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=str(e))
-    
+@app.get("/defects-camera", tags=["Dashboard"])
+async def get_defects_with_ng_gt_zero(start: datetime, end: datetime, db=Depends(get_read_db)):
+    try:
+        rows = await run_db(dashboard_db.get_defects_with_ng_gt_zero, db, start, end)
+        status = await run_db(dashboard_db.get_view_status, db, "mv_defects_camera")
+        return JSONResponse(content=jsonable_encoder(rows), headers=staleness_headers(status))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-# @app.get("/ng-distribution")
-# def ng_distribution( dashboard: schemas.Dashboard,db: Session = Depends(get_db)):
-#     try:
-#         return DashboardDB().ng_distribution(dashboard,db)
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=str(e))
-    
+@app.get("/good-ng-ratio", tags=["Dashboard"])
+async def get_good_ng(
+    productname: Optional[str] = None,
+    prodline: Optional[str] = None,
+    cameraid: Optional[str] = None,
+    db=Depends(get_read_db),
+):
+    try:
+        rows = await run_db(dashboard_db.get_good_ng, db, productname, prodline, cameraid)
+        status = await run_db(dashboard_db.get_view_status, db, "mv_good_ng_ratio")
+        return JSONResponse(content=jsonable_encoder(rows), headers=staleness_headers(status))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-# @app.get("/top5-defects")
-# def get_top5_defects( dashboard: schemas.Dashboard,db: Session = Depends(get_db)):
-#     try:
-#         return DashboardDB().get_top5_defects(dashboard,db)
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=str(e))
-    
+@app.get("/dashboard/filters", tags=["Dashboard"])
+async def get_dashboard_filters(db=Depends(get_read_db)):
+    try:
+        return group_facets(await run_db(dashboard_db.get_filters, db))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-# @app.get("/top5-trends")
-# async def get_top_5_trends( dashboard: schemas.Dashboard,db: Session = Depends(get_db)):
-#     try:
-#         return DashboardDB().get_top_5_trends(dashboard,db)
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=str(e))
-    
+@app.get("/dashboard/summary", tags=["Dashboard"])
+async def get_dashboard_summary(
+    start: datetime,
+    end: datetime,
+    productname: Optional[str] = None,
+    prodline: Optional[str] = None,
+    cameraid: Optional[str] = None,
+    db=Depends(get_read_db),
+):
+    try:
+        summary = await run_db(dashboard_db.get_summary, db, start, end, productname, prodline, cameraid)
+        # good_ng_ratio and defects_camera are read from the materialized views
+        status = oldest_status(
+            await run_db(dashboard_db.get_view_status, db, "mv_good_ng_ratio"),
+            await run_db(dashboard_db.get_view_status, db, "mv_defects_camera"),
+        )
+        return JSONResponse(content=jsonable_encoder(summary), headers=staleness_headers(status))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/ng-distribution", tags=["Dashboard"])
+async def ng_distribution(
+    start: datetime,
+    end: datetime,
+    productname: Optional[str] = None,
+    prodline: Optional[str] = None,
+    cameraid: Optional[str] = None,
+    db=Depends(get_read_db),
+):
+    try:
+        return await run_db(dashboard_db.ng_distribution, db, start, end, productname, prodline, cameraid)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/top5-defects", tags=["Dashboard"])
+async def get_top5_defects(
+    start: datetime,
+    end: datetime,
+    productname: Optional[str] = None,
+    prodline: Optional[str] = None,
+    cameraid: Optional[str] = None,
+    db=Depends(get_read_db),
+):
+    try:
+        return await run_db(dashboard_db.get_top5_defects, db, start, end, productname, prodline, cameraid)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/top5-trends", tags=["Dashboard"])
+async def get_top_5_trends(
+    start: datetime,
+    end: datetime,
+    productname: Optional[str] = None,
+    prodline: Optional[str] = None,
+    cameraid: Optional[str] = None,
+    db=Depends(get_read_db),
+):
+    try:
+        return await run_db(dashboard_db.get_top_5_trends, db, start, end, productname, prodline, cameraid)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/total-product", tags=["Dashboard"])
+async def get_total_products(
+    start: datetime,
+    end: datetime,
+    productname: Optional[str] = None,
+    prodline: Optional[str] = None,
+    cameraid: Optional[str] = None,
+    db=Depends(get_read_db),
+):
+    try:
+        return await run_db(dashboard_db.get_total_products, db, start, end, productname, prodline, cameraid)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-# @app.get("/total-product")    
-# def get_total_products( dashboard: schemas.Dashboard,db: Session = Depends(get_db)):
-#     try:
-#         return DashboardDB().get_total_products(dashboard,db)
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=str(e))
-    
 
 # -------------------- Run Server --------------------
 # if __name__ == "__main__":
@@ -1,19 +1,369 @@
-import cv2
-
-# read from forwarded stream (via FFMPEG)
-cap = cv2.VideoCapture("udp://0.0.0.0:1234")
-
-def gen_frames():
-    if not cap.isOpened():
-        print("Could not open stream")
-        return
-    while True:
-        success, frame = cap.read()
-        if not success:
-            print("Frame read failed")
-            break
-        _, buffer = cv2.imencode('.jpg', frame)
-        frame = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from fastapi.concurrency import run_in_threadpool
+from database.connect_to_db import SessionLocal, text
+from streaming.frame_pool import SharedFrames, frame_pool
 
+try:
+    import cv2
+except ImportError:  # only needed by the MJPEG endpoints
+    cv2 = None
+
+# Source for cameras without camera.streamurl (the ffmpeg UDP forward)
+CAMERA_STREAM_URL = os.getenv("CAMERA_STREAM_URL", "udp://0.0.0.0:1234")
+STREAM_JPEG_QUALITY = int(os.getenv("STREAM_JPEG_QUALITY", "80"))
+# Upper bound for a viewer's fps parameter
+STREAM_MAX_FPS = int(os.getenv("STREAM_MAX_FPS", "30"))
+# A capture with no viewers for this many seconds is released
+STREAM_IDLE_TIMEOUT = float(os.getenv("STREAM_IDLE_TIMEOUT", "10"))
+STREAM_RECONNECT = float(os.getenv("STREAM_RECONNECT", "2"))
+# Continuous in-memory recording of every camera, so an NG result can be saved
+# with the seconds around it. Each camera's capture then runs without viewers.
+STREAM_RECORD = os.getenv("STREAM_RECORD", "false").lower() in ("1", "true", "yes")
+STREAM_RECORD_WIDTH = int(os.getenv("STREAM_RECORD_WIDTH", "1280"))
+STREAM_RECORD_QUALITY = int(os.getenv("STREAM_RECORD_QUALITY", "70"))
+STREAM_RECORD_FPS = int(os.getenv("STREAM_RECORD_FPS", "10"))
+# Seconds kept before and after the NG result
+STREAM_CLIP_PRE = float(os.getenv("STREAM_CLIP_PRE", "5"))
+STREAM_CLIP_POST = float(os.getenv("STREAM_CLIP_POST", "5"))
+STREAM_CLIP_DIR = os.getenv("STREAM_CLIP_DIR", "/app/shared/clips")
+# How often the recorded camera list is re-read from the camera table
+STREAM_RECORD_REFRESH = float(os.getenv("STREAM_RECORD_REFRESH", "60"))
+
+MJPEG_MEDIA_TYPE = "multipart/x-mixed-replace; boundary=frame"
+
+
+def resolve_stream_url(camera_id: str):
+    with SessionLocal() as db:
+        row = db.execute(text("SELECT streamurl FROM camera WHERE cameraid = :cameraid AND isdeleted = false"),
+                         {"cameraid": camera_id}).first()
+    if row is None:
+        return None
+    return row.streamurl or CAMERA_STREAM_URL
+
+
+def list_stream_urls():
+    with SessionLocal() as db:
+        rows = db.execute(text("SELECT cameraid, streamurl FROM camera WHERE isdeleted = false")).all()
+    return {row.cameraid: row.streamurl or CAMERA_STREAM_URL for row in rows}
+
+
+def write_clip(path: str, frames: list):
+    # MJPEG clip: the JPEGs back to back, playable with ffmpeg/VLC. Written
+    # under a temporary name so a reader never sees a partial file.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + ".part"
+    with open(partial, "wb") as f:
+        for jpeg in frames:
+            f.write(jpeg)
+    os.replace(partial, path)
+
+
+class FrameRing:
+    # Encoded frames of the last `seconds`, oldest first
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.frames = deque()
+
+    def append(self, at: float, jpeg: bytes):
+        self.frames.append((at, jpeg))
+        while at - self.frames[0][0] > self.seconds:
+            self.frames.popleft()
+
+    def window(self, start: float, end: float):
+        return [jpeg for at, jpeg in self.frames if start <= at <= end]
+
+
+def stream_tier(width: int = None, quality: int = None, fps: float = None):
+    # Viewer parameters are snapped so that near-identical requests share a tier
+    width = max(16, width - width % 16) if width else None
+    quality = min(max(round((quality or STREAM_JPEG_QUALITY) / 5) * 5, 10), 95)
+    fps = min(max(round(fps), 1), STREAM_MAX_FPS) if fps else None
+    return width, quality, fps
+
+
+RECORD_TIER = stream_tier(STREAM_RECORD_WIDTH, STREAM_RECORD_QUALITY, STREAM_RECORD_FPS)
+
+
+class StreamTier:
+    # Latest frame at one (width, quality, fps). Viewers wait for `seq` to move
+    # past the last frame they sent, so a slow viewer skips frames instead of
+    # queueing them.
+    def __init__(self, width: int, quality: int, fps: float):
+        self.width = width
+        self.quality = quality
+        self.interval = 1 / fps if fps else 0
+        self.next_due = 0.0
+        self.viewers = 0
+        self.latest = None
+        self.frame_no = 0
+        self.seq = 0
+        self.ring = None
+        self._changed = asyncio.Event()
+
+    def due(self, now: float):
+        # Server-side decimation: frames between two due times are never encoded
+        if now < self.next_due:
+            return False
+        self.next_due += self.interval
+        if self.next_due <= now:
+            self.next_due = now + self.interval
+        return True
+
+    def _publish(self, jpeg: bytes, frame_no: int):
+        # Pool workers can finish out of order; never step back to an older frame
+        if frame_no <= self.frame_no:
+            return
+        self.frame_no = frame_no
+        self.latest = jpeg
+        self.seq += 1
+        if self.ring is not None:
+            self.ring.append(time.monotonic(), jpeg)
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def next_frame(self, seen: int):
+        while self.seq == seen:
+            await self._changed.wait()
+        return self.seq, self.latest
+
+
+class CameraSource:
+    # One capture thread per source URL. Each frame is encoded once for every
+    # tier that has viewers and is due, never once per viewer.
+    def __init__(self, url: str, loop: asyncio.AbstractEventLoop):
+        self.url = url
+        self.loop = loop
+        self.cameras = set()
+        self.tiers = {}
+        self.viewers = 0
+        self.idle_since = time.monotonic()
+        self.frames = 0
+        self.encoded = 0
+        self.dropped = 0
+        self.recording = None
+        self.buffers = SharedFrames()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            cap = cv2.VideoCapture(self.url)
+            try:
+                if not cap.isOpened():
+                    logging.warning(f"[Stream] Could not open source for {sorted(self.cameras)}")
+                else:
+                    self._capture(cap)
+            finally:
+                cap.release()
+            self._stop.wait(STREAM_RECONNECT)
+        self.buffers.close()
+
+    def _capture(self, cap):
+        while not self._stop.is_set():
+            success, frame = cap.read()
+            if not success:
+                logging.warning(f"[Stream] Frame read failed for {sorted(self.cameras)}, reconnecting")
+                return
+            self.frames += 1
+            now = time.monotonic()
+            tiers = [tier for tier in list(self.tiers.values()) if tier.due(now)]
+            if not tiers:
+                continue
+            keys = [(tier.width, tier.quality) for tier in tiers]
+            done = functools.partial(self._encoded, tiers, self.frames)
+            if not frame_pool.submit(self.buffers, frame, keys, done):
+                self.dropped += 1
+
+    def _encoded(self, tiers: list, frame_no: int, jpegs: list):
+        for tier, jpeg in zip(tiers, jpegs):
+            if jpeg is None:
+                continue
+            self.encoded += 1
+            try:
+                self.loop.call_soon_threadsafe(tier._publish, jpeg, frame_no)
+            except RuntimeError:  # event loop closed
+                self._stop.set()
+                return
+
+    def join(self, key: tuple):
+        tier = self.tiers.get(key)
+        if tier is None:
+            tier = self.tiers[key] = StreamTier(*key)
+        tier.viewers += 1
+        self.viewers += 1
+        return tier
+
+    def leave(self, key: tuple):
+        tier = self.tiers[key]
+        tier.viewers -= 1
+        self.viewers -= 1
+        if not tier.viewers:
+            del self.tiers[key]
+        if not self.viewers:
+            self.idle_since = time.monotonic()
+
+    def record(self):
+        # The recording tier counts as a viewer until recording stops
+        if self.recording is None:
+            self.recording = self.join(RECORD_TIER)
+            self.recording.ring = FrameRing(STREAM_CLIP_PRE + STREAM_CLIP_POST + 1)
+
+    def stop_recording(self):
+        if self.recording is not None:
+            self.recording.ring = None
+            self.recording = None
+            self.leave(RECORD_TIER)
+
+
+class StreamManager:
+    def __init__(self):
+        self.sources = {}
+        self.cameras = {}
+        self.clips_saved = 0
+        self._clips = set()
+        self._reaper = None
+        self._recorder = None
+
+    def start(self):
+        frame_pool.start()
+        self._reaper = asyncio.create_task(self._reap_idle())
+        if STREAM_RECORD and cv2 is not None:
+            self._recorder = asyncio.create_task(self._record_cameras())
+
+    def stop(self):
+        for task in (self._reaper, self._recorder, *self._clips):
+            if task:
+                task.cancel()
+        for source in self.sources.values():
+            source.stop()
+        self.sources.clear()
+        self.cameras.clear()
+        frame_pool.stop()
+
+    async def open(self, camera_id: str):
+        if cv2 is None:
+            raise RuntimeError("OpenCV (cv2) is not installed")
+        url = await run_in_threadpool(resolve_stream_url, camera_id)
+        if url is None:
+            return None
+        source = self._source(camera_id, url)
+        # Grace period until the response starts iterating
+        source.idle_since = time.monotonic()
+        return source
+
+    def _source(self, camera_id: str, url: str):
+        # Cameras that share a URL share the capture; a UDP port can only be
+        # bound once anyway
+        source = self.sources.get(url)
+        if source is None:
+            source = self.sources[url] = CameraSource(url, asyncio.get_running_loop())
+            source.start()
+        previous = self.cameras.get(camera_id)
+        if previous is not None and previous is not source:  # streamurl changed
+            self._forget(camera_id)
+        source.cameras.add(camera_id)
+        self.cameras[camera_id] = source
+        return source
+
+    def _forget(self, camera_id: str):
+        source = self.cameras.pop(camera_id)
+        source.cameras.discard(camera_id)
+        if not source.cameras:
+            source.stop_recording()
+
+    async def _record_cameras(self):
+        while True:
+            try:
+                urls = await run_in_threadpool(list_stream_urls)
+                for camera_id, url in urls.items():
+                    self._source(camera_id, url).record()
+                for camera_id in [c for c in self.cameras if c not in urls]:  # deleted cameras
+                    self._forget(camera_id)
+            except Exception as e:
+                logging.error(f"[Stream] Camera list for recording not loaded: {e}")
+            await asyncio.sleep(STREAM_RECORD_REFRESH)
+
+    def attach_clip(self, camera_id: str, data: dict, on_saved):
+        # For an NG push, writes a clip once the post-roll has been recorded and
+        # then awaits on_saved(path); nothing is linked to a clip that was not written
+        if str(data.get("status", "")).upper() != "NG":
+            return
+        source = self.cameras.get(camera_id)
+        if source is None or source.recording is None:
+            return
+        path = os.path.join(STREAM_CLIP_DIR, f"{camera_id}-{datetime.now():%Y%m%d-%H%M%S-%f}.mjpeg")
+        task = asyncio.create_task(self._save_clip(source.recording.ring, time.monotonic(), path, on_saved))
+        self._clips.add(task)
+        task.add_done_callback(self._clips.discard)
+
+    async def _save_clip(self, ring: FrameRing, at: float, path: str, on_saved):
+        await asyncio.sleep(STREAM_CLIP_POST)
+        frames = ring.window(at - STREAM_CLIP_PRE, at + STREAM_CLIP_POST)
+        if not frames:
+            logging.warning(f"[Stream] No recorded frames for {path}")
+            return
+        try:
+            await run_in_threadpool(write_clip, path, frames)
+            self.clips_saved += 1
+        except OSError as e:
+            logging.error(f"[Stream] Clip {path} not written: {e}")
+            return
+        await on_saved(path)
+
+    async def mjpeg(self, source: CameraSource, tier: tuple = None):
+        key = tier or stream_tier()
+        stream = source.join(key)
+        try:
+            seen = 0
+            while True:
+                seen, jpeg = await stream.next_frame(seen)
+                yield b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"
+        finally:
+            source.leave(key)
+
+    async def _reap_idle(self):
+        while True:
+            await asyncio.sleep(STREAM_IDLE_TIMEOUT)
+            now = time.monotonic()
+            for url, source in list(self.sources.items()):
+                if not source.viewers and now - source.idle_since >= STREAM_IDLE_TIMEOUT:
+                    source.stop()
+                    del self.sources[url]
+                    for camera_id in source.cameras:
+                        if self.cameras.get(camera_id) is source:
+                            del self.cameras[camera_id]
+
+    def stats(self):
+        # Keyed by camera rather than URL, which may carry credentials
+        sources = [
+            {
+                "cameras": sorted(source.cameras),
+                "viewers": source.viewers,
+                "frames": source.frames,
+                "encoded": source.encoded,
+                "dropped": source.dropped,
+                "recording": source.recording is not None,
+                "tiers": [
+                    {"width": width, "quality": quality, "fps": fps, "viewers": tier.viewers}
+                    for (width, quality, fps), tier in source.tiers.items()
+                ],
+            }
+            for source in self.sources.values()
+        ]
+        return {"sources": sources, "clipsPending": len(self._clips), "clipsSaved": self.clips_saved}
+
+
+stream_manager = StreamManager()
@@ -0,0 +1,133 @@
+import logging
+import os
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:  # only needed by the MJPEG endpoints
+    cv2 = np = None
+
+# Worker processes for JPEG resize/encode. 0 keeps the work on each capture thread.
+FRAME_POOL_WORKERS = int(os.getenv("FRAME_POOL_WORKERS", "0"))
+# Shared-memory frame buffers per source. While all are out with the workers,
+# new frames for that source are dropped instead of queued.
+FRAME_POOL_SLOTS = int(os.getenv("FRAME_POOL_SLOTS", "3"))
+
+
+def encode_jpeg(frame, width: int, quality: int):
+    if width and width < frame.shape[1]:
+        height = round(frame.shape[0] * width / frame.shape[1])
+        frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    success, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes() if success else None
+
+
+def encode_shared(name: str, shape: tuple, dtype: str, tiers: list):
+    # Runs in a worker: the frame is read in place from shared memory, only the
+    # encoded JPEGs are pickled back
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        frame = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        jpegs = [encode_jpeg(frame, width, quality) for width, quality in tiers]
+        del frame
+        return jpegs
+    finally:
+        shm.close()
+
+
+class SharedFrames:
+    # Shared-memory buffers for one source. A buffer is busy from submit until
+    # the worker's result comes back, then reused for a later frame.
+    def __init__(self, slots: int = FRAME_POOL_SLOTS):
+        self.slots = slots
+        self.free = []
+        self.busy = 0
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def acquire(self, nbytes: int):
+        with self._lock:
+            while self.free:
+                shm = self.free.pop()
+                if shm.size >= nbytes:
+                    self.busy += 1
+                    return shm
+                self._discard(shm)  # resolution went up
+            if self.busy >= self.slots:
+                return None
+            self.busy += 1
+            return shared_memory.SharedMemory(create=True, size=nbytes)
+
+    def release(self, shm):
+        with self._lock:
+            self.busy -= 1
+            if self.closed:
+                self._discard(shm)
+            else:
+                self.free.append(shm)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            for shm in self.free:
+                self._discard(shm)
+            self.free = []
+
+    @staticmethod
+    def _discard(shm):
+        shm.close()
+        shm.unlink()
+
+
+class FramePool:
+    def __init__(self, workers: int = FRAME_POOL_WORKERS):
+        self.workers = workers
+        self.executor = None
+
+    def start(self):
+        # spawn rather than fork: the parent already runs capture threads
+        if self.workers > 0 and cv2 is not None:
+            self.executor = ProcessPoolExecutor(self.workers, mp_context=get_context("spawn"))
+
+    def stop(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def submit(self, buffers: SharedFrames, frame, tiers: list, callback):
+        # Encodes `frame` once per (width, quality) in `tiers` and passes the JPEGs
+        # to callback: inline without a pool, otherwise from the pool's result
+        # thread. Returns False when the frame is dropped because no buffer is free.
+        executor = self.executor
+        if executor is None:
+            callback([encode_jpeg(frame, width, quality) for width, quality in tiers])
+            return True
+        shm = buffers.acquire(frame.nbytes)
+        if shm is None:
+            return False
+        np.ndarray(frame.shape, dtype=frame.dtype, buffer=shm.buf)[:] = frame
+        try:
+            future = executor.submit(encode_shared, shm.name, frame.shape, frame.dtype.str, tiers)
+        except RuntimeError as e:  # BrokenProcessPool or shut down
+            buffers.release(shm)
+            logging.error(f"[Stream] Frame pool unavailable, encoding inline: {e}")
+            self.executor = None
+            return self.submit(buffers, frame, tiers, callback)
+
+        def done(future):
+            buffers.release(shm)
+            try:
+                callback(future.result())
+            except CancelledError:
+                pass
+            except Exception as e:
+                logging.error(f"[Stream] Frame encode failed: {e}")
+
+        future.add_done_callback(done)
+        return True
+
+
+frame_pool = FramePool()
@@ -0,0 +1,33 @@
+import os
+import sys
+
+# The API modules import each other as top-level packages (database, streaming)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asyncio
+import httpx
+import pytest
+
+
+@pytest.fixture(scope="module")
+def api():
+    # Calls the app on one event loop, which keeps asyncpg connections usable
+    # across requests under DB_ASYNC; skipped without a database
+    import main
+    from database.connect_to_db import SQLAlchemyError, async_engine, engine, text
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except SQLAlchemyError as e:
+        pytest.skip(f"Database unavailable: {e}")
+    loop = asyncio.new_event_loop()
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+
+    def call(method: str, url: str, **kwargs):
+        return loop.run_until_complete(http.request(method, url, **kwargs))
+
+    yield call
+    loop.run_until_complete(http.aclose())
+    if async_engine:
+        loop.run_until_complete(async_engine.dispose())
+    loop.close()
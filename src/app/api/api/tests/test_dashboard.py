@@ -0,0 +1,22 @@
+from database.matviews import refresh_materialized_views
+
+WINDOW = {"start": "2000-01-01T00:00:00", "end": "2100-01-01T00:00:00"}
+
+
+def test_summary_defects_camera_matches_defects_camera(api):
+    refresh_materialized_views()
+    rows = api("GET", "/defects-camera", params=WINDOW).json()
+    assert api("GET", "/dashboard/summary", params=WINDOW).json()["defects_camera"] == rows
+
+    if rows:
+        camera = {"cameraid": rows[0]["cameraid"], "prodline": rows[0]["line"]}
+        filtered = api("GET", "/dashboard/summary", params={**WINDOW, **camera}).json()["defects_camera"]
+        assert filtered == [r for r in rows if r["cameraid"] == camera["cameraid"] and r["line"] == camera["prodline"]]
+
+
+def test_summary_reports_the_staleness_of_its_views(api):
+    refresh_materialized_views()
+    response = api("GET", "/dashboard/summary", params=WINDOW)
+    assert response.status_code == 200
+    assert int(response.headers["Age"]) >= 0
+    assert response.headers["X-Data-Refreshed-At"] != "never"
@@ -0,0 +1,43 @@
+from sqlalchemy import event
+
+from database.cache import master_data_cache
+from database.connect_to_db import async_engine, engine, text
+
+DEFECT_TYPE_ID = "TEST-ETAG"
+
+
+def checkouts_during(call):
+    pools = [engine.pool] + ([async_engine.sync_engine.pool] if async_engine else [])
+    count = []
+
+    def on_checkout(*args):
+        count.append(1)
+
+    for pool in pools:
+        event.listen(pool, "checkout", on_checkout)
+    try:
+        return call(), len(count)
+    finally:
+        for pool in pools:
+            event.remove(pool, "checkout", on_checkout)
+
+
+def test_revalidation_skips_the_query_until_a_write(api):
+    master_data_cache.clear()
+    first = api("GET", "/defecttypes")
+    etag = first.headers["ETag"]
+
+    revalidated, checkouts = checkouts_during(lambda: api("GET", "/defecttypes", headers={"If-None-Match": etag}))
+    assert revalidated.status_code == 304 and revalidated.headers["ETag"] == etag
+    assert checkouts == 0
+
+    try:
+        created = api("POST", "/adddefecttype", json={"defectTypeId": DEFECT_TYPE_ID, "defectTypeName": "ETag"})
+        assert created.status_code == 200
+        changed = api("GET", "/defecttypes", headers={"If-None-Match": etag})
+        assert changed.status_code == 200 and changed.headers["ETag"] != etag
+        assert DEFECT_TYPE_ID in changed.text
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM public.defecttype WHERE defectid = :defectid"), {"defectid": DEFECT_TYPE_ID})
+        master_data_cache.invalidate("defecttype")
@@ -0,0 +1,96 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+import database.ingest as ingest
+from database.connect_to_db import SQLAlchemyError, engine, text
+
+CAMERA = "TEST-INGEST-CAM"
+
+
+def stored():
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT prodid FROM public.productdefectresult WHERE cameraid = :camera ORDER BY prodid
+        """), {"camera": CAMERA}).scalars().all()
+
+
+def cleanup():
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM public.productdefectresult WHERE cameraid = :camera"), {"camera": CAMERA})
+
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    try:
+        cleanup()
+    except SQLAlchemyError as e:
+        pytest.skip(f"Database unavailable: {e}")
+    monkeypatch.setattr(ingest, "INGEST_SPOOL_DIR", str(tmp_path))
+    yield ingest.IngestWriter()
+    cleanup()
+
+
+def row(prodid: str, defecttime: str = "2026-01-02 03:04:05"):
+    return {"prodid": prodid, "cameraid": CAMERA, "defecttime": defecttime, "prodstatus": "NG"}
+
+
+def spool(path, rows):
+    path.write_text("".join((r if isinstance(r, str) else json.dumps(r)) + "\n" for r in rows), encoding="utf-8")
+
+
+def test_replay_dead_letters_rejected_rows_and_keeps_going(writer, tmp_path):
+    spool(tmp_path / "spool-1.ndjson", [row("A"), row("B", "not a time"), row("C")])
+    spool(tmp_path / "spool-2.ndjson", [row("D"), row("E"), "{truncated"])
+
+    writer._replay()
+
+    assert stored() == ["A", "C", "D", "E"]
+    assert [p.name for p in tmp_path.iterdir()] == [f"spool-dead-{os.getpid()}.ndjson"]
+    dead = (tmp_path / f"spool-dead-{os.getpid()}.ndjson").read_text().splitlines()
+    assert json.loads(dead[0])["prodid"] == "B" and dead[1] == "{truncated"
+    assert writer.stats()["dead"] == 2
+
+
+def test_replay_moves_a_file_to_dead_after_the_last_attempt(writer, tmp_path, monkeypatch):
+    spool(tmp_path / f"spool-retry-{ingest.INGEST_REPLAY_ATTEMPTS - 1}-x.ndjson", [row("A")])
+    monkeypatch.setattr(writer, "_write", lambda rows: False)
+
+    writer._replay()
+
+    assert [p.name.startswith("spool-dead-") for p in tmp_path.iterdir()] == [True]
+
+
+def test_flush_writes_valid_rows_of_a_rejected_batch(writer, tmp_path):
+    writer.add(row("A"))
+    writer.add(row("B", "not a time"))
+    ingest.asyncio.run(writer.flush())
+
+    assert stored() == ["A"]
+    assert writer.stats() == {"buffered": 0, "written": 1, "spooled": 0, "dead": 1}
+
+
+def test_defect_time_is_parsed_and_made_local():
+    aware = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    assert ingest.parse_defect_time(CAMERA, aware.isoformat()) == aware.astimezone().replace(tzinfo=None)
+    assert ingest.parse_defect_time(CAMERA, "2026-01-02T03:04:05") == datetime(2026, 1, 2, 3, 4, 5)
+    assert isinstance(ingest.parse_defect_time(CAMERA, "yesterday"), datetime)
+
+
+def test_clip_is_linked_to_a_buffered_or_stored_result(writer):
+    buffered = ingest.result_row(CAMERA, {"status": "NG", "productId": "A", "productName": "A"})
+    writer.add(buffered)
+    ingest.asyncio.run(writer.attach_clip(buffered, "/clips/a.mjpeg"))
+    assert writer.buffer == [buffered] and buffered["clippath"] == "/clips/a.mjpeg"
+
+    stored = ingest.result_row(CAMERA, {"status": "NG", "productId": "B", "productName": "B"})
+    writer.add(stored)
+    ingest.asyncio.run(writer.flush())
+    ingest.asyncio.run(writer.attach_clip(stored, "/clips/b.mjpeg"))
+    with engine.connect() as conn:
+        clips = conn.execute(text("""
+            SELECT prodid, clippath FROM public.productdefectresult WHERE cameraid = :camera ORDER BY prodid
+        """), {"camera": CAMERA}).all()
+    assert clips == [("A", "/clips/a.mjpeg"), ("B", "/clips/b.mjpeg")]
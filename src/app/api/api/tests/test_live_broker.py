@@ -0,0 +1,80 @@
+import asyncio
+import base64
+
+import pytest
+
+import database.live_broker as live_broker
+from database.connect_to_db import SQLAlchemyError, engine, text
+from database.migrations import apply_migrations
+
+CAMERA_ID = "TEST-LIVE-BROKER"
+
+
+class Local:
+    # Stands in for the LiveBroadcaster of one worker
+    def __init__(self, *cameras):
+        self.subscribers = {camera_id: [object()] for camera_id in cameras}
+        self.frames = asyncio.Queue()
+
+    def clients(self, camera_id: str):
+        return len(self.subscribers.get(camera_id, []))
+
+    def publish(self, camera_id: str, data: dict):
+        self.frames.put_nowait((camera_id, data))
+        return True
+
+    def stats(self, camera_id: str):
+        return {"clients": self.clients(camera_id)}
+
+
+@pytest.fixture
+def brokers(monkeypatch):
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except SQLAlchemyError as e:
+        pytest.skip(f"Database unavailable: {e}")
+    apply_migrations()
+    monkeypatch.setattr(live_broker, "LIVE_BROKER_PRESENCE", 0.05)
+    monkeypatch.setattr(live_broker, "LIVE_BROKER_MAX_FPS", 5)
+    yield live_broker.PostgresBroker(Local()), live_broker.PostgresBroker(Local(CAMERA_ID))
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM public.live_frame WHERE cameraid = :cameraid"), {"cameraid": CAMERA_ID})
+
+
+def frame(count: int):
+    return {"objectCounting": count, "liveStream": base64.b64encode(b"jpeg-%d" % count).decode()}
+
+
+async def round_trip(sender, receiver):
+    await receiver.start()
+    await sender.start()
+    try:
+        # The sender learns from live_subscribers that another worker watches
+        # the camera; until the receiver is listening a notification can be missed
+        for _ in range(100):
+            if CAMERA_ID in sender.watched and receiver.listener is not None:
+                break
+            await asyncio.sleep(0.05)
+        assert CAMERA_ID in sender.watched
+        await asyncio.sleep(0.2)
+
+        assert (await sender.publish(CAMERA_ID, frame(1)))["status"] == "published"
+        camera_id, data = await asyncio.wait_for(receiver.local.frames.get(), 5)
+        assert camera_id == CAMERA_ID
+        assert data["objectCounting"] == 1 and bytes(data["liveStream"]) == b"jpeg-1"
+
+        # Inside the frame interval pushes are held back and the latest one wins
+        assert (await sender.publish(CAMERA_ID, frame(2)))["status"] == "throttled"
+        assert (await sender.publish(CAMERA_ID, frame(3)))["status"] == "throttled"
+        assert len(sender._writers) == 1
+        _, data = await asyncio.wait_for(receiver.local.frames.get(), 5)
+        assert data["objectCounting"] == 3
+        assert not sender._writers
+    finally:
+        await sender.stop()
+        await receiver.stop()
+
+
+def test_frame_reaches_another_worker_through_notify(brokers):
+    asyncio.run(round_trip(*brokers))
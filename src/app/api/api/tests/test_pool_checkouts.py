@@ -0,0 +1,74 @@
+import asyncio
+import httpx
+import pytest
+from sqlalchemy import event
+
+import main
+from database.cache import master_data_cache
+from database.connect_to_db import SQLAlchemyError, async_engine, engine, text
+
+LIST_ROUTES = [
+    "/users", "/roles", "/products", "/product-types", "/cameras", "/defecttypes",
+    "/planning", "/transaction", "/productdefectresults", "/defectsummary",
+]
+DEFECT_TYPE_ID = "TEST-POOL-CHECKOUTS"
+
+
+@pytest.fixture(scope="module")
+def client():
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except SQLAlchemyError as e:
+        pytest.skip(f"Database unavailable: {e}")
+    # ASGITransport skips the startup events, whose refreshers would check out
+    # connections of their own; one loop keeps asyncpg connections usable
+    loop = asyncio.new_event_loop()
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test")
+
+    def call(method: str, url: str, **kwargs):
+        return loop.run_until_complete(http.request(method, url, **kwargs))
+
+    yield call
+    loop.run_until_complete(http.aclose())
+    if async_engine:
+        loop.run_until_complete(async_engine.dispose())
+    loop.close()
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM public.defecttype WHERE defectid = :defectid"), {"defectid": DEFECT_TYPE_ID})
+
+
+@pytest.fixture
+def checkouts():
+    pools = [engine.pool] + ([async_engine.sync_engine.pool] if async_engine else [])
+    count = []
+
+    def on_checkout(*args):
+        count.append(1)
+
+    for pool in pools:
+        event.listen(pool, "checkout", on_checkout)
+    # Cached lists would not touch the pool at all
+    master_data_cache.clear()
+    yield count
+    for pool in pools:
+        event.remove(pool, "checkout", on_checkout)
+
+
+@pytest.mark.parametrize("route", LIST_ROUTES)
+def test_list_route_checks_out_one_connection(client, checkouts, route):
+    response = client("GET", route)
+    assert response.status_code == 200
+    assert len(checkouts) == 1
+
+
+def test_add_defect_type_checks_out_one_connection(client, checkouts):
+    response = client("POST", "/adddefecttype", json={"defectTypeId": DEFECT_TYPE_ID, "defectTypeName": "Pool checkouts"})
+    assert response.status_code == 200
+    assert len(checkouts) == 1
+
+
+def test_update_defect_type_checks_out_one_connection(client, checkouts):
+    response = client("PUT", "/updatedefecttype", params={"defectid": DEFECT_TYPE_ID}, json={"description": "updated"})
+    assert response.status_code == 200
+    assert len(checkouts) == 1
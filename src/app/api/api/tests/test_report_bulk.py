@@ -0,0 +1,75 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from database.connect_to_db import SQLAlchemyError, engine, text
+
+LOT = "TEST-REPORT-LOT"
+PRODUCT = "TEST-REPORT-PRODUCT"
+
+
+def cleanup():
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM public.defectsummary WHERE prodlot = :lot"), {"lot": LOT})
+        conn.execute(text("DELETE FROM public.productdefectresult WHERE prodid = :prodid"), {"prodid": PRODUCT})
+
+
+@pytest.fixture(scope="module")
+def client():
+    try:
+        cleanup()
+    except SQLAlchemyError as e:
+        pytest.skip(f"Database unavailable: {e}")
+    yield TestClient(main.app)
+    cleanup()
+
+
+def defect(defect_type: str, ok: int, ng: int):
+    return {"lotNo": LOT, "productType": PRODUCT, "defectType": defect_type, "total": ok + ng, "ok": ok, "ng": ng}
+
+
+def product(status: str, defect_type: str):
+    return {
+        "datetime": "2026-01-02T03:04:05", "productId": PRODUCT, "productName": "Report test",
+        "lotNo": LOT, "status": status, "defectType": defect_type, "cameraId": "TEST-CAM",
+    }
+
+
+def summary_rows():
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT prodid, defectid, totalok, totalng FROM public.defectsummary
+            WHERE prodlot = :lot ORDER BY defectid
+        """), {"lot": LOT}).all()
+
+
+def test_add_report_defects_upserts_by_lot_product_and_defect(client):
+    response = client.post("/addreportdefects", json=[defect("D1", 1, 1), defect("D2", 5, 0), defect("D1", 9, 2)])
+    assert response.status_code == 200
+    assert summary_rows() == [(PRODUCT, "D1", 9, 2), (PRODUCT, "D2", 5, 0)]
+
+    response = client.post("/addreportdefects", json=[defect("D2", 7, 1)])
+    assert response.status_code == 200
+    assert summary_rows() == [(PRODUCT, "D1", 9, 2), (PRODUCT, "D2", 7, 1)]
+
+
+def test_add_report_defect_conflicts_on_a_stored_key(client):
+    assert client.post("/addreportdefect", json=defect("D3", 1, 0)).status_code == 200
+    assert client.post("/addreportdefect", json=defect("D3", 2, 0)).status_code == 409
+    assert (PRODUCT, "D3", 1, 0) in summary_rows()
+
+
+def test_add_report_products_inserts_results(client):
+    response = client.post("/addreportproducts", json=[product("OK", "None"), product("NG", "Scratch")])
+    assert response.status_code == 200
+    assert client.post("/addreportproduct", json=product("NG", "Dent")).status_code == 200
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT prodname, prodstatus, defecttype, cameraid, defecttime::text FROM public.productdefectresult
+            WHERE prodid = :prodid ORDER BY resultid
+        """), {"prodid": PRODUCT}).all()
+    assert rows == [
+        ("Report test", "OK", "None", "TEST-CAM", "2026-01-02 03:04:05"),
+        ("Report test", "NG", "Scratch", "TEST-CAM", "2026-01-02 03:04:05"),
+        ("Report test", "NG", "Dent", "TEST-CAM", "2026-01-02 03:04:05"),
+    ]
@@ -1,9 +1,11 @@
-from fastapi import FastAPI, HTTPException, Depends, Body, WebSocket, WebSocketDisconnect, Request
+from fastapi import FastAPI, HTTPException, Depends, Body, Query, WebSocket, WebSocketDisconnect, Request
+from typing import Optional
 import asyncio
+import functools
 from database.connect_to_db import Session
 from database.user import UserDB, UserService
 from database.product import ProductDB, ProductService
-from database.connect_to_db import test_db_connection, SessionLocal
+from database.connect_to_db import test_db_connection, get_pool_metrics
 import database.schemas as schemas
 from database.defect import DefectDB
 from database.camera import CameraDB, CameraService
@@ -14,8 +16,11 @@ from database.report import ReportDB
 from database.role import RoleDB
 from database.permission import PermissionDB
 from database.menu import MenuDB
-from database.live_inspection import live_defect_ws_handler, active_websockets, pending_updates
-from streaming.live_stream import setup_streaming, websocket_clients
+from database.live_inspection import live_defect_ws_handler, broadcaster, parse_live_frame
+from database.live_broker import live_broker
+from database.ingest import ingest_writer, ingest_push, LIVE_INGEST
+from database.cache import master_data_cache
+from streaming.camera_stream import stream_manager, stream_tier, MJPEG_MEDIA_TYPE
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware 
 
@@ -41,9 +46,16 @@ app = FastAPI(
 )
 
 @app.on_event("startup")
-def on_startup():
-    # Register the current event loop for your kafka thread to use
-    setup_streaming(asyncio.get_event_loop())
+async def start_live_broker():
+    await live_broker.start()
+    ingest_writer.start()
+    stream_manager.start()
+
+@app.on_event("shutdown")
+async def stop_live_broker():
+    stream_manager.stop()
+    await ingest_writer.stop()
+    await live_broker.stop()
 
 app.add_middleware(
     CORSMiddleware,
@@ -53,13 +65,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 user_db = UserDB()
 product_db = ProductDB()
 camera_db = CameraDB()
@@ -68,17 +73,64 @@ role_db = RoleDB()
 permission_db = PermissionDB()
 menu_db = MenuDB()
 
+@app.get("/metrics/db-pool", tags=["General"])
+def db_pool_metrics():
+    return get_pool_metrics()
+
+@app.get("/metrics/cache", tags=["General"])
+def cache_metrics():
+    return {"master_data": master_data_cache.stats()}
+
+@app.get("/metrics/ingest", tags=["General"])
+def ingest_metrics():
+    return ingest_writer.stats()
+
+@app.get("/metrics/streams", tags=["General"])
+def stream_metrics():
+    return stream_manager.stats()
+
+@app.get("/stream/{camera_id}", tags=["Live"]) # MJPEG, any number of viewers per capture
+async def camera_stream(
+    camera_id: str,
+    width: Optional[int] = Query(None, ge=16),  # full resolution if omitted
+    quality: Optional[int] = Query(None, ge=1, le=100),
+    fps: Optional[float] = Query(None, gt=0),  # every captured frame if omitted
+):
+    try:
+        source = await stream_manager.open(camera_id)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if source is None:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    return StreamingResponse(stream_manager.mjpeg(source, stream_tier(width, quality, fps)), media_type=MJPEG_MEDIA_TYPE)
+
 @app.websocket("/live-defect/{camera_id}")
 async def live_defect(websocket: WebSocket, camera_id: str):
-    db_gen = get_db()
-    db = next(db_gen)
-    await live_defect_ws_handler(websocket, camera_id, db)
+    await live_defect_ws_handler(websocket, camera_id)
 
 @app.post("/live-defect-data/{camera_id}") # Endpoint to push live defect data from node-red
 async def push_live_defect_data(camera_id: str, request: Request):
     data = await request.json()
-    if camera_id in pending_updates:
-        await pending_updates[camera_id].put(data)
-        return {"status": "queued", "clients": len(active_websockets.get(camera_id, []))}
-    return {"status": "no_active_socket"}
+    # Live fan-out first; the verdict is buffered even if publishing fails, and
+    # an NG clip is linked to its row once the clip has been written
+    try:
+        return await live_broker.publish(camera_id, data)
+    finally:
+        row = await ingest_push(camera_id, data)
+        stream_manager.attach_clip(camera_id, data, functools.partial(ingest_writer.attach_clip, row))
 
+@app.post("/live-defect-frame/{camera_id}") # Binary push from node-red: header length, JSON results, raw JPEG
+async def push_live_defect_frame(camera_id: str, request: Request):
+    if live_broker.local_only and not broadcaster.clients(camera_id) and not LIVE_INGEST:
+        return {"status": "no_active_socket"}
+    try:
+        data = parse_live_frame(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Live fan-out first; the verdict is buffered even if publishing fails, and
+    # an NG clip is linked to its row once the clip has been written
+    try:
+        return await live_broker.publish(camera_id, data)
+    finally:
+        row = await ingest_push(camera_id, data)
+        stream_manager.attach_clip(camera_id, data, functools.partial(ingest_writer.attach_clip, row))
@@ -4,6 +4,7 @@ import React, { useState, useMemo } from "react";
 import { ChevronLeft, ChevronRight, ChevronFirst, ChevronLast, ChevronUp, ChevronDown } from "lucide-react";
 import { useReactTable, getCoreRowModel, ColumnDef, ColumnMeta, SortingState, flexRender, Row } from "@tanstack/react-table";
 import { formatNumber } from "@/app/utils/format";
+import type { CursorPaging } from "./useCursorPaging";
 
 interface MyColumnMeta<TData> extends ColumnMeta<TData, unknown> {
   style?: React.CSSProperties;
@@ -18,11 +19,16 @@ interface DataTableProps<TData> {
   data: TData[] | null;
   selectedIds?: (string | number)[];
   defaultSorting: SortingState;
+  // Server-side keyset paging: `data` holds only the current page and sorting
+  // applies within it
+  paging?: CursorPaging;
 }
 
-export default function DataTable<TData>({ columns, data, selectedIds, defaultSorting }: DataTableProps<TData>) {
-  const [page, setPage] = useState(1);
-  const [pageSize, setPageSize] = useState(10);
+export default function DataTable<TData>({ columns, data, selectedIds, defaultSorting, paging }: DataTableProps<TData>) {
+  const [localPage, setLocalPage] = useState(1);
+  const [localPageSize, setLocalPageSize] = useState(10);
+  const page = paging ? paging.page : localPage;
+  const pageSize = paging ? paging.pageSize : localPageSize;
   const [sorting, setSorting] = useState<SortingState>(defaultSorting);
 
   const safeData = useMemo(() => (Array.isArray(data) ? data : []), [data]);
@@ -39,10 +45,11 @@ export default function DataTable<TData>({ columns, data, selectedIds, defaultSo
   }, [safeData, sorting]);
 
   const paginatedData = useMemo(() => {
+    if (paging) return sortedData;
     const start = (page - 1) * pageSize;
     const end = start + pageSize;
     return sortedData.slice(start, end);
-  }, [sortedData, page, pageSize]);
+  }, [sortedData, page, pageSize, paging]);
 
   const handleSort = (columnId: string) => {
     if (columnId === "no") return;
@@ -62,7 +69,17 @@ export default function DataTable<TData>({ columns, data, selectedIds, defaultSo
   const totalRows = safeData.length;
   const totalPages = Math.ceil(totalRows / pageSize);
   const isFirstPage = page === 1;
-  const isLastPage = page >= totalPages;
+  const isLastPage = paging ? !paging.hasNext : page >= totalPages;
+  const firstRow = (page - 1) * pageSize + 1;
+
+  const changePageSize = (size: number) => {
+    if (paging) return paging.setPageSize(size);
+    setLocalPageSize(size);
+    setLocalPage(1);
+  };
+  const firstPage = () => (paging ? paging.first() : setLocalPage(1));
+  const prevPage = () => (paging ? paging.prev() : setLocalPage(p => Math.max(1, p - 1)));
+  const nextPage = () => (paging ? paging.next() : setLocalPage(p => Math.min(totalPages, p + 1)));
 
   return (
     <div>
@@ -138,7 +155,7 @@ export default function DataTable<TData>({ columns, data, selectedIds, defaultSo
       {/* Pagination Controls */}
       <div className="flex flex-col md:flex-row justify-between items-center mt-4 text-sm">
         <span className="mb-2 md:mb-0">
-          Total Records: {formatNumber(totalRows)}
+          {paging ? `Page ${formatNumber(page)}` : `Total Records: ${formatNumber(totalRows)}`}
           {selectedIds && selectedIds?.length > 0 && (
             <span className="ml-2">
               ({selectedIds?.length} row{selectedIds?.length > 1 ? "s" : ""} selected)
@@ -151,10 +168,7 @@ export default function DataTable<TData>({ columns, data, selectedIds, defaultSo
           <select
             className="border px-2 py-1 rounded"
             value={pageSize}
-            onChange={e => {
-              setPageSize(Number(e.target.value));
-              setPage(1);
-            }}
+            onChange={e => changePageSize(Number(e.target.value))}
           >
             {[10, 20, 50, 100].map(size => (
               <option key={size} value={size}>
@@ -167,7 +181,7 @@ export default function DataTable<TData>({ columns, data, selectedIds, defaultSo
             className={`w-8 h-8 flex justify-center items-center border rounded-full bg-gray-300 hover:bg-gray-200 ${
               isFirstPage ? "cursor-not-allowed" : ""
             }`}
-            onClick={() => setPage(1)}
+            onClick={firstPage}
             disabled={isFirstPage}
           >
             <ChevronFirst size={16} />
@@ -176,32 +190,37 @@ export default function DataTable<TData>({ columns, data, selectedIds, defaultSo
             className={`w-8 h-8 flex justify-center items-center border rounded-full bg-gray-300 hover:bg-gray-200 ${
               isFirstPage ? "cursor-not-allowed" : ""
             }`}
-            onClick={() => setPage(p => Math.max(1, p - 1))}
+            onClick={prevPage}
             disabled={isFirstPage}
           >
             <ChevronLeft size={16} />
           </button>
           <span className="flex justify-center min-w-[90px]">
-            {(page - 1) * pageSize + 1}-{Math.min(page * pageSize, totalRows)} of {formatNumber(totalRows)}
+            {paging
+              ? `${formatNumber(firstRow)}-${formatNumber(firstRow + totalRows - 1)}`
+              : `${firstRow}-${Math.min(page * pageSize, totalRows)} of ${formatNumber(totalRows)}`}
           </span>
           <button
             className={`w-8 h-8 flex justify-center items-center border rounded-full bg-gray-300 hover:bg-gray-200 ${
               isLastPage ? "cursor-not-allowed" : ""
             }`}
-            onClick={() => setPage(p => Math.min(totalPages, p + 1))}
+            onClick={nextPage}
             disabled={isLastPage}
           >
             <ChevronRight size={16} />
           </button>
-          <button
-            className={`w-8 h-8 flex justify-center items-center border rounded-full bg-gray-300 hover:bg-gray-200 ${
-              isLastPage ? "cursor-not-allowed" : ""
-            }`}
-            onClick={() => setPage(totalPages)}
-            disabled={isLastPage}
-          >
-            <ChevronLast size={16} />
-          </button>
+          {/* Keyset pages have no known last page */}
+          {!paging && (
+            <button
+              className={`w-8 h-8 flex justify-center items-center border rounded-full bg-gray-300 hover:bg-gray-200 ${
+                isLastPage ? "cursor-not-allowed" : ""
+              }`}
+              onClick={() => setLocalPage(totalPages)}
+              disabled={isLastPage}
+            >
+              <ChevronLast size={16} />
+            </button>
+          )}
         </div>
       </div>
     </div>
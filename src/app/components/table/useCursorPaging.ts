@@ -0,0 +1,48 @@
+"use client";
+
+import { useState } from "react";
+import type { Page, PageRequest } from "@/app/types/paging";
+
+export type CursorPaging = {
+  page: number;
+  pageSize: number;
+  hasNext: boolean;
+  first: () => Promise<void>;
+  next: () => Promise<void>;
+  prev: () => Promise<void>;
+  setPageSize: (size: number) => Promise<void>;
+};
+
+// Keyset pages can only be reached from the page before them, so the cursor
+// each visited page was fetched with is kept to step back to it
+export default function useCursorPaging<T>(
+  fetchPage: (paging: PageRequest) => Promise<Page<T>>,
+  onRows: (rows: T[]) => void,
+  defaultPageSize = 10
+): CursorPaging {
+  const [cursors, setCursors] = useState<(string | undefined)[]>([undefined]);
+  const [nextCursor, setNextCursor] = useState<string>();
+  const [pageSize, setSize] = useState(defaultPageSize);
+
+  const load = async (index: number, pageCursors: (string | undefined)[], size: number) => {
+    const res = await fetchPage({ cursor: pageCursors[index], limit: size });
+    onRows(res.rows);
+    setCursors(pageCursors.slice(0, index + 1));
+    setNextCursor(res.nextCursor);
+  };
+
+  const page = cursors.length;
+
+  return {
+    page,
+    pageSize,
+    hasNext: !!nextCursor,
+    first: () => load(0, [undefined], pageSize),
+    next: () => (nextCursor ? load(page, [...cursors, nextCursor], pageSize) : Promise.resolve()),
+    prev: () => (page > 1 ? load(page - 2, cursors, pageSize) : Promise.resolve()),
+    setPageSize: (size: number) => {
+      setSize(size);
+      return load(0, [undefined], size);
+    },
+  };
+}
@@ -130,6 +130,8 @@ export const API_ROUTES = {
     update: "/update-model-assignment",
   },
   dashboard: {
+    summary: "/dashboard/summary",
+    filters: "/dashboard/filters",
     total_products: "/dashboard-totalproduct",
     good_ng_ratio: "/dashboard-goodngratio",
     top5_trends: "/dashboard-top5trends",
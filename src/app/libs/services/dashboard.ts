@@ -47,6 +47,51 @@ const fetchDashboardData = async <T>(endpoint: string, filters: DashboardFilters
   }
 };
 
+// Row mappers shared by the per-chart calls and the combined summary
+const toGoodNGRatio = (item: any): GoodNGRatioData => ({
+  prodname: item.prodname || '',
+  cameraid: item.cameraid || '',
+  prodlot: item.line || '',
+  line: item.line || '',
+  total_ok: Number(item.total_ok) || 0,
+  total_ng: Number(item.total_ng) || 0,
+  ok_ratio_percent: Number(item.ok_ratio_percent) || 0,
+  ng_ratio_percent: Number(item.ng_ratio_percent) || 0
+});
+
+const toDefectType = (item: any): DefectTypeData => ({
+  defecttype: item.defecttype || '',
+  line: item.line || '',
+  quantity: Number(item.quantity) || 0,
+  all_defect_times: Array.isArray(item.all_defect_times) ? item.all_defect_times : []
+});
+
+const toTrend = (item: any): TrendData => ({
+  defecttype: item.defecttype || '',
+  line: item.line || '',
+  hour_slot: item.hour_slot || '',
+  quantity: Number(item.quantity) || 0
+});
+
+const toDefectCamera = (item: any): DefectCameraData => ({
+  prodid: item.prodid || '',
+  defectid: item.defectid || '',
+  defecttype: item.defecttype || '',
+  cameraid: item.cameraid || '',
+  line: item.line || item.LINE || '',
+  cameraname: item.cameraname || '',
+  totalng: Number(item.totalng) || 0,
+  defecttime: item.defecttime || ''
+});
+
+const toNgDistribution = (item: any): NgDistributionData => ({
+  defecttype: item.defecttype || '',
+  prodname: item.prodname || '',
+  line: item.line || '',
+  hour_slot: item.hour_slot || '',
+  defect_count: Number(item.defect_count) || 0
+});
+
 // Dashboard data services - ✅ ใช้ API_ROUTES แล้ว
 export const getTotalProducts = async (filters: DashboardFilters): Promise<TotalProductsData> => {
   const data = await fetchDashboardData<{ total_products: number }>(
@@ -58,61 +103,27 @@ export const getTotalProducts = async (filters: DashboardFilters): Promise<Total
 
 export const getGoodNGRatio = async (filters: DashboardFilters): Promise<GoodNGRatioData[]> => {
   const data = await fetchDashboardData<any>(API_ROUTES.dashboard.good_ng_ratio, filters);
-  return data.map(item => ({
-    prodname: item.prodname || '',
-    cameraid: item.cameraid || '',
-    prodlot: item.line || '',
-    line: item.line || '',
-    total_ok: Number(item.total_ok) || 0,
-    total_ng: Number(item.total_ng) || 0,
-    ok_ratio_percent: Number(item.ok_ratio_percent) || 0,
-    ng_ratio_percent: Number(item.ng_ratio_percent) || 0
-  }));
+  return data.map(toGoodNGRatio);
 };
 
 export const getTopDefects = async (filters: DashboardFilters): Promise<DefectTypeData[]> => {
   const data = await fetchDashboardData<any>(API_ROUTES.dashboard.top5_defects, filters);
-  return data.map(item => ({
-    defecttype: item.defecttype || '',
-    line: item.line || '',
-    quantity: Number(item.quantity) || 0,
-    all_defect_times: Array.isArray(item.all_defect_times) ? item.all_defect_times : []
-  }));
+  return data.map(toDefectType);
 };
 
 export const getTopTrends = async (filters: DashboardFilters): Promise<TrendData[]> => {
   const data = await fetchDashboardData<any>(API_ROUTES.dashboard.top5_trends, filters);
-  return data.map(item => ({
-    defecttype: item.defecttype || '',
-    line: item.line || '',
-    hour_slot: item.hour_slot || '',
-    quantity: Number(item.quantity) || 0
-  }));
+  return data.map(toTrend);
 };
 
 export const getDefectsByCamera = async (filters: DashboardFilters): Promise<DefectCameraData[]> => {
   const data = await fetchDashboardData<any>(API_ROUTES.dashboard.defects_camera, filters); // ✅ ใช้ defects_camera
-  return data.map(item => ({
-    prodid: item.prodid || '',
-    defectid: item.defectid || '',
-    defecttype: item.defecttype || '',
-    cameraid: item.cameraid || '',
-    line: item.line || item.LINE || '',
-    cameraname: item.cameraname || '',
-    totalng: Number(item.totalng) || 0,
-    defecttime: item.defecttime || ''
-  }));
+  return data.map(toDefectCamera);
 };
 
 export const getNGDistribution = async (filters: DashboardFilters): Promise<NgDistributionData[]> => {
   const data = await fetchDashboardData<any>(API_ROUTES.dashboard.ng_distribution, filters);
-  return data.map(item => ({
-    defecttype: item.defecttype || '',
-    prodname: item.prodname || '',
-    line: item.line || '',
-    hour_slot: item.hour_slot || '',
-    defect_count: Number(item.defect_count) || 0
-  }));
+  return data.map(toNgDistribution);
 };
 
 // Dropdown data services
@@ -146,6 +157,25 @@ export const getLines = async (): Promise<LineOption[]> => {
   }
 };
 
+// All three dropdowns in one request, with a result count per value
+export const getFilterOptions = async (): Promise<{
+  products: ProductOption[];
+  cameras: CameraOption[];
+  lines: LineOption[];
+}> => {
+  try {
+    const response = await api.get<any>(API_ROUTES.dashboard.filters);
+    return {
+      products: Array.isArray(response?.products) ? response.products : [],
+      cameras: Array.isArray(response?.cameras) ? response.cameras : [],
+      lines: Array.isArray(response?.lines) ? response.lines : []
+    };
+  } catch (error) {
+    console.error('Failed to fetch filter options:', error);
+    return { products: [], cameras: [], lines: [] };
+  }
+};
+
 export const getDashboardData = async (filters: DashboardFilters): Promise<DashboardData> => {
   if (!filters.startDate || !filters.endDate) {
     throw new Error('Start date and end date are required');
@@ -155,21 +185,15 @@ export const getDashboardData = async (filters: DashboardFilters): Promise<Dashb
     console.log('Fetching dashboard data with filters:', filters);
   }
 
-  const [
-    totalProducts,
-    goodNgRatio, 
-    defectsByType,
-    trendData,
-    defectsByCamera,
-    ngDistribution
-  ] = await Promise.all([
-    getTotalProducts(filters),
-    getGoodNGRatio(filters),
-    getTopDefects(filters),
-    getTopTrends(filters),
-    getDefectsByCamera(filters),
-    getNGDistribution(filters)
-  ]);
+  // One request: the API derives every chart from the same filtered rollup slice
+  const summary = await api.get<any>(API_ROUTES.dashboard.summary, buildParams(filters));
+
+  const totalProducts: TotalProductsData = { total_products: Number(summary?.total_products) || 0 };
+  const goodNgRatio = (summary?.good_ng_ratio ?? []).map(toGoodNGRatio);
+  const defectsByType = (summary?.top5_defects ?? []).map(toDefectType);
+  const trendData = (summary?.top5_trends ?? []).map(toTrend);
+  const defectsByCamera = (summary?.defects_camera ?? []).map(toDefectCamera);
+  const ngDistribution = (summary?.ng_distribution ?? []).map(toNgDistribution);
 
   const result: DashboardData = {
     totalProducts,
@@ -2,13 +2,14 @@ import { api } from '@/app/utils/api'
 import { API_ROUTES } from "@/app/constants/endpoint";
 import type { Planning, ParamSearch } from "@/app/types/planning"
 import { SelectOption } from "@/app/types/select-option";
+import type { Page, PageRequest } from "@/app/types/paging";
 import { extractErrorMessage } from '@/app/utils/errorHandler';
 
-export const search = async (param?: ParamSearch) => { 
+export const search = async (param: ParamSearch | undefined, paging: PageRequest): Promise<Page<Planning>> => { 
   try {
-    const res = await api.get<any>(API_ROUTES.planning.get, param);
+    const { rows, nextCursor } = await api.getPage<any>(API_ROUTES.planning.get, 'planning', param, paging);
 
-    const mapData: Planning[] = res?.planning?.map((item) => ({
+    const mapData: Planning[] = rows.map((item) => ({
       id: item.planid,
       planId: item.planid,
       productId: item.prodid,
@@ -23,7 +24,7 @@ export const search = async (param?: ParamSearch) => {
       updatedBy: item.updatedby,
     }));
 
-    return mapData;
+    return { rows: mapData, nextCursor };
   } catch (error) {
     throw new Error(extractErrorMessage(error));
   }  
@@ -2,13 +2,14 @@ import { api } from '@/app/utils/api'
 import { API_ROUTES } from "@/app/constants/endpoint";
 import type { ReportProduct, ParamSearch, ProductDetail  } from "@/app/types/report-product-defect"
 import { SelectOption } from "@/app/types/select-option";
+import type { Page, PageRequest } from "@/app/types/paging";
 import { extractErrorMessage } from '@/app/utils/errorHandler';
 
-export const search = async (param?: ParamSearch) => { 
+export const search = async (param: ParamSearch | undefined, paging: PageRequest): Promise<Page<ReportProduct>> => { 
   try {
-    const res = await api.get<any>(API_ROUTES.report_product.get, param);
+    const { rows, nextCursor } = await api.getPage<any>(API_ROUTES.report_product.get, 'product_defect_results', param, paging);
 
-    const mapData: ReportProduct[] = res?.product_defect_results?.map((item) => ({
+    const mapData: ReportProduct[] = rows.map((item) => ({
       runningNo: item.resultid,
       datetime: item.defecttime,
       id: item.prodid,
@@ -22,7 +23,7 @@ export const search = async (param?: ParamSearch) => {
       imageUrl: item.imagepath,
     }));
 
-    return mapData; 
+    return { rows: mapData, nextCursor }; 
   } catch (error) {
     throw new Error(extractErrorMessage(error));
   }  
@@ -2,13 +2,14 @@ import { api } from '@/app/utils/api'
 import { API_ROUTES } from "@/app/constants/endpoint";
 import type { Transaction, ParamSearch } from "@/app/types/transaction"
 import { SelectOption } from "@/app/types/select-option";
+import type { Page, PageRequest } from "@/app/types/paging";
 import { extractErrorMessage } from '@/app/utils/errorHandler';
 
-export const search = async (param?: ParamSearch) => { 
+export const search = async (param: ParamSearch | undefined, paging: PageRequest): Promise<Page<Transaction>> => { 
   try {
-    const res = await api.get<any>(API_ROUTES.transaction.get, param);
+    const { rows, nextCursor } = await api.getPage<any>(API_ROUTES.transaction.get, 'transaction', param, paging);
     
-    const mapData: Transaction[] = res?.transaction?.map((item) => ({
+    const mapData: Transaction[] = rows.map((item) => ({
       runningNo: item.runningno,
       startDate: item.actualstartdatetime,
       endDate: item.actualenddatetime,
@@ -22,7 +23,7 @@ export const search = async (param?: ParamSearch) => {
       updatedBy: item.updatedby,
     }));
       
-    return mapData;
+    return { rows: mapData, nextCursor };
   } catch (error) {
     throw new Error(extractErrorMessage(error));
   }  
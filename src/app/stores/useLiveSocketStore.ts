@@ -1,9 +1,27 @@
 import { create } from 'zustand';
 import { MockLiveWebSocket } from '@/app/mocks/mock-live-websocket';
 
+// Opt in to the binary frame protocol: each message is a 4-byte big-endian
+// header length, a JSON header, then the raw JPEG (no base64 inflation)
+const LIVE_SOCKET_BINARY = process.env.NEXT_PUBLIC_LIVE_SOCKET_BINARY === 'true';
+
+const textDecoder = new TextDecoder();
+
+// Decodes either wire format into the payload shape the live view renders.
+// In binary mode liveStream is an object URL; revoke it once the frame is replaced.
+export const parseLiveMessage = (data: string | ArrayBuffer): any => {
+  if (typeof data === 'string') {
+    return JSON.parse(data);
+  }
+  const headerLength = new DataView(data).getUint32(0);
+  const header = JSON.parse(textDecoder.decode(new Uint8Array(data, 4, headerLength)));
+  const image = new Blob([new Uint8Array(data, 4 + headerLength)], { type: 'image/jpeg' });
+  return { ...header, liveStream: URL.createObjectURL(image) };
+};
+
 interface LiveSocketState {
   socket: WebSocket | MockLiveWebSocket | null;
-  connect: (cameraId: string) => void;
+  connect: (cameraId: string, binary?: boolean) => void;
   disconnect: () => void;
   send: (data: any) => void;
 }
@@ -11,14 +29,17 @@ interface LiveSocketState {
 export const useLiveSocketStore = create<LiveSocketState>((set, get) => ({
   socket: null,
 
-  connect: (cameraId: string) => {
+  connect: (cameraId: string, binary: boolean = LIVE_SOCKET_BINARY) => {
     if (get().socket) return;
 
     // For MockLiveWebSocket
     // const socket = new MockLiveWebSocket(cameraId) as unknown as WebSocket;
 
     const socketUrl = `${process.env.NEXT_PUBLIC_LIVE_SOCKET_URL}/${cameraId}` || `ws://localhost:8010/live-defect/${cameraId}`;
-    const socket = new WebSocket(socketUrl);
+    const socket = new WebSocket(binary ? `${socketUrl}?mode=binary` : socketUrl);
+    if (binary) {
+      socket.binaryType = 'arraybuffer';
+    }
 
     socket.onopen = () => {
       console.log("Live WebSocket connected");
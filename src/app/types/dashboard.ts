@@ -74,16 +74,19 @@ export interface DashboardData {
 export interface ProductOption {
   id: string;
   name: string;
+  count?: number;
 }
 
 export interface CameraOption {
   id: string;
   name: string;
+  count?: number;
 }
 
 export interface LineOption {
   id: string;
   name: string;
+  count?: number;
 }
 
 // Component States
@@ -0,0 +1,9 @@
+export type PageRequest = {
+  cursor?: string;
+  limit: number;
+};
+
+export type Page<T> = {
+  rows: T[];
+  nextCursor?: string;
+};
@@ -4,6 +4,7 @@ import axios, {
   AxiosResponse,
   // InternalAxiosRequestConfig,
 } from 'axios';
+import type { Page, PageRequest } from '@/app/types/paging';
 // import { getSession, signOut } from 'next-auth/react';
 // import { toastError } from '@/app/utils/toast';
 
@@ -155,6 +156,19 @@ const uploadFile = async <T>(url: string, formData: FormData, config?: AxiosRequ
   return res.data;
 };
 
+// Keyset-paged list endpoints return one page of `limit` rows under `key`
+// plus the next_cursor to pass back for the page after it
+const getPage = async <T>(
+  url: string,
+  key: string,
+  params: Record<string, any> | undefined,
+  paging: PageRequest,
+  config?: AxiosRequestConfig
+): Promise<Page<T>> => {
+  const res = await api.get<any>(url, { ...params, cursor: paging.cursor, limit: paging.limit }, config);
+  return { rows: res?.[key] ?? [], nextCursor: res?.next_cursor ?? undefined };
+};
+
 // API
 export const api = {
   get: <T>(url: string, params?: Record<string, any>, config?: AxiosRequestConfig) => {
@@ -179,4 +193,5 @@ export const api = {
     request<T>('delete', url, config),
 
   upload: uploadFile,
+  getPage,
 };